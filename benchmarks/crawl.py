@@ -0,0 +1,197 @@
+"""
+End-to-end benchmark of the crawlers against the local mock of Alibaba (see
+:mod:`benchmarks.mockserver`): the catalog spider crawls the search pages of all areas,
+then the detail spider crawls the suppliers found, both with the middlewares, pipelines
+and stores of the project, in a temporary cache directory.
+
+Reports pages and items per second, the p50 and p99 latency of downloads, captcha hits,
+and the peak RSS of each crawler process, as a baseline for performance changes.
+
+Pages are downloaded without browsers, and the captcha is passed as soon as it appears:
+its hits are reported as in the hybrid mode (backing off the throttle), and the request
+is sent again. Delays of the throttle are scaled down to the latency of the server.
+
+    python -m benchmarks.crawl [latency] [pages] [punish-rate] [concurrency]
+"""
+
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Self
+
+from scrapy import Request, Spider, signals
+from scrapy.crawler import Crawler
+from scrapy.http import Response
+
+from src.signals import captcha_detected
+
+from .mockserver import MockAlibaba
+
+
+class PassCaptchaMiddleware(object):
+    """
+    Takes the place of :class:`src.middlewares.InteractiveMiddleware`: punished requests
+    are reported with :data:`src.signals.captcha_detected`, and sent again as if the
+    captcha is passed.
+    """
+
+    crawler: Crawler
+
+    def __init__(self, crawler: Crawler) -> None:
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        return cls(crawler)
+
+    def process_response(
+        self,
+        request: Request,
+        response: Response,
+        spider: Spider,
+    ) -> Response | Request:
+        if "punish" not in response.url:
+            return response
+        self.crawler.stats.inc_value("captcha/count")
+        self.crawler.signals.send_catch_log(
+            captcha_detected,
+            request=request,
+            spider=spider,
+        )
+        # sent again from where it was redirected to the punish page.
+        url = request.meta.get("redirect_urls", [request.url])[0]
+        meta = {k: v for k, v in request.meta.items() if not k.startswith("redirect_")}
+        return request.replace(url=url, meta=meta, dont_filter=True)
+
+
+def crawl(name: str, host: str, concurrency: int) -> dict:
+    """
+    Crawls the mock server with the spider of the name (``catalog`` or ``detail``),
+    returning the measurements.
+    """
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    from src.conf import CONFIG
+    from src.spiders.catalog import CatalogSpider
+    from src.spiders.detail import DetailSpider
+
+    CONFIG["throttle"].update(
+        {
+            "start-delay": 0.05,
+            "min-delay": 0.0,
+            "max-delay": 1.0,
+            "max-concurrency": concurrency,
+        }
+    )
+
+    class MockCatalogSpider(CatalogSpider):
+        allowed_domains = ["127.0.0.1"]
+
+        def search_url(self, area, page=None):
+            url = f"http://{host}/trade/search?SearchText={area.address}"
+            return url if page is None else f"{url}&page={page}"
+
+        def parse(self, response):
+            for result in super().parse(response):
+                # next pages are linked under alibaba.com, in the serial mode.
+                if isinstance(result, Request):
+                    url = result.url.replace("https://alibaba.com", f"http://{host}")
+                    result = result.replace(url=url)
+                yield result
+
+    class MockDetailSpider(DetailSpider):
+        allowed_domains = ["127.0.0.1"]
+
+        def start_requests(self):
+            # supplier links are protocol-relative, and taken as https by catalogs.
+            for request in super().start_requests():
+                yield request.replace(url=request.url.replace("https:", "http:", 1))
+
+    spider = {"catalog": MockCatalogSpider, "detail": MockDetailSpider}[name]
+    settings = get_project_settings()
+    middlewares = settings.getdict("DOWNLOADER_MIDDLEWARES")
+    middlewares["src.middlewares.InteractiveMiddleware"] = None
+    middlewares["benchmarks.crawl.PassCaptchaMiddleware"] = 553
+    settings.set("DOWNLOADER_MIDDLEWARES", middlewares)
+    settings.set("CONCURRENT_REQUESTS", concurrency)
+    settings.set("LOG_LEVEL", "WARNING")
+    if name == "catalog":
+        settings.set("ITEM_PIPELINES", {"src.pipelines.CatalogItemPipeline": 300})
+
+    latencies: list[float] = []
+
+    def response_received(response: Response, request: Request, spider: Spider) -> None:
+        latencies.append(request.meta.get("download_latency", 0.0))
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(spider)
+    crawler.signals.connect(response_received, signal=signals.response_received)
+    process.crawl(crawler)
+    process.start()
+
+    stats = crawler.stats.get_stats()
+    seconds = (stats["finish_time"] - stats["start_time"]).total_seconds()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0]
+    return {
+        "seconds": seconds,
+        "pages": stats.get("response_received_count", 0),
+        "items": stats.get("item_scraped_count", 0),
+        "captcha": stats.get("captcha/count", 0),
+        "p50": quantiles[min(49, len(quantiles) - 1)],
+        "p99": quantiles[-1],
+        "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def run(name: str, host: str, concurrency: int, cache: str) -> dict:
+    """Runs :func:`crawl` in a fresh process with the cache directory."""
+    output = subprocess.check_output(
+        [
+            *(sys.executable, "-m", "benchmarks.crawl"),
+            *("--crawl", name, host, str(concurrency)),
+        ],
+        env={**os.environ, "CRAWLER_CACHE_DIR": cache},
+        text=True,
+    )
+    return json.loads(output.splitlines()[-1])
+
+
+def benchmark_main() -> None:
+    if sys.argv[1:2] == ["--crawl"]:
+        name, host, concurrency = sys.argv[2], sys.argv[3], int(sys.argv[4])
+        print(json.dumps(crawl(name, host, concurrency)))
+        return
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    punish_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.02
+    concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else 16
+
+    mock = MockAlibaba(latency, pages, punish_rate)
+    mock.start()
+    try:
+        with tempfile.TemporaryDirectory() as cache:
+            for name in ("catalog", "detail"):
+                result = run(name, mock.host, concurrency, cache)
+                seconds = result["seconds"]
+                print(
+                    f"{name}: {result['pages']} pages, {result['items']} items "
+                    f"in {seconds:.2f}s, "
+                    f"{result['pages'] / seconds:.1f} pages/s, "
+                    f"{result['items'] / seconds:.1f} items/s, "
+                    f"latency p50 {result['p50'] * 1000:.0f} ms "
+                    f"p99 {result['p99'] * 1000:.0f} ms, "
+                    f"{result['captcha']} captcha, "
+                    f"peak RSS {result['rss'] / 2**20:.0f} MiB"
+                )
+    finally:
+        mock.stop()
+    print(f"served: {mock.served}")
+
+
+if __name__ == "__main__":
+    benchmark_main()
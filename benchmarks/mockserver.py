@@ -0,0 +1,170 @@
+"""
+A local mock of Alibaba, serving synthetic search and supplier pages (see
+:mod:`benchmarks.pages`), so that crawlers can be measured without the network and
+without risking bans.
+
+Every response is delayed by ``latency`` seconds on average (uniformly from half to one
+and a half of it), every area has ``pages`` pages of search results, and a
+``punish_rate`` of requests is redirected to the punish page of the captcha, as Alibaba
+does. Supplier links point at the server itself, as ``//<host>/<domain>/...``.
+
+    python -m benchmarks.mockserver [port] [latency] [pages] [punish-rate]
+"""
+
+import html
+import http.server
+import random
+import sys
+import threading
+import time
+import zlib
+from urllib.parse import parse_qs, quote, urlparse
+
+from .pages import detail_page, search_page
+
+# addresses of suppliers in the areas of the configuration, for details to be located.
+_ADDRESSES = [
+    "No. 1 Binjiang Road, Jingjiang, Taizhou, Jiangsu, China",
+    "No. 8 Gulou Road, Taixing, Taizhou, Jiangsu, China",
+    "No. 16 Fenghuang Road, Hailing District, Taizhou, Jiangsu, China",
+    "No. 3 Gangcheng Road, Gaogang District, Taizhou, Jiangsu, China",
+    "No. 27 Tiantai Road, Jiangyan District, Taizhou, Jiangsu, China",
+]
+
+_PUNISH_PAGE = (
+    "<html><head><title>Captcha Interception</title></head><body>"
+    '<div id="nocaptcha">Please slide to verify</div></body></html>'
+)
+
+
+class MockAlibaba(object):
+    """
+    The mock server, serving from a thread of its own between :meth:`start` and
+    :meth:`stop`. Counts of requests served are kept in :attr:`served` by kind
+    (``search``, ``detail`` and ``punish``).
+    """
+
+    latency: float
+    pages: int
+    punish_rate: float
+    cards: int
+    filler: int
+    served: dict[str, int]
+    first_request: threading.Event
+    _random: random.Random
+    _lock: threading.Lock
+    _server: http.server.ThreadingHTTPServer | None
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        pages: int = 5,
+        punish_rate: float = 0.0,
+        *,
+        cards: int = 40,
+        filler: int = 2000,
+        seed: int = 0,
+    ) -> None:
+        assert 0 <= punish_rate < 1, "punish rate should be in [0, 1)"
+        self.latency = latency
+        self.pages = pages
+        self.punish_rate = punish_rate
+        self.cards = cards
+        self.filler = filler
+        self.served = {"search": 0, "detail": 0, "punish": 0}
+        self.first_request = threading.Event()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def host(self) -> str:
+        assert self._server is not None, "the server is not started"
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self, port: int = 0) -> None:
+        handler = type("Handler", (_Handler,), {"mock": self})
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def search_url(self, text: str, page: int | None = None) -> str:
+        """URL of a page of the search results, as spiders make it."""
+        url = f"http://{self.host}/trade/search?SearchText={quote(text)}"
+        return url if page is None else f"{url}&page={page}"
+
+    def respond(self, path: str) -> tuple[int, dict[str, str], str]:
+        """Status, headers and body of a request of the path."""
+        url = urlparse(path)
+        with self._lock:
+            delay = self.latency * self._random.uniform(0.5, 1.5)
+            punished = self._random.random() < self.punish_rate
+        self.first_request.set()
+        time.sleep(delay)
+
+        if url.path == "/punish":
+            self._count("punish")
+            return 200, {}, _PUNISH_PAGE
+        if punished:
+            target = quote(f"http://{self.host}{path}", safe="")
+            return 302, {"Location": f"/punish?x5step=1&url={target}"}, ""
+        if url.path == "/trade/search":
+            self._count("search")
+            query = parse_qs(url.query)
+            text = query.get("SearchText", ["area"])[0]
+            page = int(query.get("page", ["1"])[0])
+            body = search_page(
+                text,
+                page,
+                self.pages,
+                cards=self.cards,
+                host=self.host,
+                filler=self.filler,
+            )
+            return 200, {}, body
+        if url.path.endswith("/company_profile.html"):
+            self._count("detail")
+            domain = url.path.split("/")[1]
+            address = _ADDRESSES[zlib.crc32(domain.encode()) % len(_ADDRESSES)]
+            return 200, {}, detail_page(domain, address, filler=self.filler * 2)
+        return 404, {}, f"<html><body>{html.escape(url.path)}</body></html>"
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.served[kind] += 1
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    mock: MockAlibaba
+
+    def do_GET(self) -> None:
+        status, headers, text = self.mock.respond(self.path)
+        body = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+if __name__ == "__main__":
+    mock = MockAlibaba(
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.05,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 5,
+        float(sys.argv[4]) if len(sys.argv) > 4 else 0.0,
+    )
+    mock.start(int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
+    print(f"serving on http://{mock.host}/trade/search?SearchText=taizhou")
+    threading.Event().wait()
@@ -0,0 +1,94 @@
+"""
+Synthetic pages of Alibaba, structured to match the XPaths of ``crawler-config.toml``.
+
+Real pages are much larger than the data we extract, so the pages are padded with
+``filler`` unrelated elements. Run this module to regenerate the saved fixtures.
+"""
+
+import html
+import pathlib
+
+FIXTURES_DIR = pathlib.Path(__file__).parent / "fixtures"
+
+
+def search_page(
+    text: str,
+    page: int,
+    pages: int,
+    *,
+    cards: int = 40,
+    host: str = "",
+    filler: int = 2000,
+) -> str:
+    """
+    A page of search results, with ``cards`` suppliers and a link to the next page.
+
+    Supplier URLs are protocol-relative like the real ones; ``host`` overrides the host
+    of them (e.g. a local mock server).
+    """
+    parts = ["<html><head><title>Search</title></head><body>"]
+    parts.append(_filler(filler))
+    for i in range(cards):
+        domain = f"{text}{page:03d}{i:02d}"
+        supplier = f"//{domain}.en.alibaba.com" if not host else f"//{host}/{domain}"
+        parts.append(
+            '<div class="factory-card">'
+            "<div><div><div></div><div><h3>"
+            f'<a href="{supplier}/company_profile.html">'
+            f"{html.escape(text.title())} Supplier {page}-{i} Co., Ltd.</a>"
+            "</h3></div></div></div>"
+            "<div><div><div><div>"
+            "<strong>Main products:</strong><strong>Widgets,Gadgets,Gizmos</strong>"
+            "</div></div></div></div>"
+            "</div>"
+        )
+    parts.append('<div class="searchx-pagination"><a href="#">prev</a>')
+    if page < pages:
+        parts.append(f'<a href="/trade/search?SearchText={text}&amp;page={page + 1}">')
+        parts.append("next</a>")
+    parts.append(f'<span class="total-pages">{pages}</span></div>')
+    parts.append(_filler(filler))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def detail_page(name: str, address: str, *, filler: int = 4000) -> str:
+    """A company profile page of a supplier."""
+    rows = [
+        f"<tr><td>a</td><td>b</td><td>c</td><td>{_cell(address)}</td></tr>",
+        "<tr><td>a</td><td>b</td></tr>",
+        f"<tr><td>a</td><td>{_cell('US$2.5 Million - US$5 Million')}</td></tr>",
+    ]
+    return (
+        f"<html><head><title>{html.escape(name)}</title></head><body>"
+        + _filler(filler // 2)
+        + '<div id="8919138051"><div><div><div>'
+        + "<div></div><div></div><div><div><table>"
+        + "".join(rows)
+        + "</table></div></div>"
+        + "</div></div></div></div>"
+        + '<div id="8945312245"><div><div></div><div><div><ul>'
+        + "<li></li><li></li><li><strong>US$1 Million</strong><div>120</div></li>"
+        + "</ul></div></div></div></div>"
+        + _filler(filler // 2)
+        + "</body></html>"
+    )
+
+
+def _cell(text: str) -> str:
+    return f"<div><div><div>{html.escape(text)}</div></div></div>"
+
+
+def _filler(count: int) -> str:
+    return "".join(
+        f'<div class="filler-{i % 7}"><span>lorem ipsum {i}</span></div>'
+        for i in range(count)
+    )
+
+
+if __name__ == "__main__":
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    (FIXTURES_DIR / "search.html").write_text(search_page("taizhou", 1, 50))
+    (FIXTURES_DIR / "detail.html").write_text(
+        detail_page("Taizhou Supplier Co., Ltd.", "Taizhou, Jiangsu, China")
+    )
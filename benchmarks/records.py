@@ -0,0 +1,97 @@
+"""
+Memory benchmark of the slotted, frozen records against the former dataclasses.
+
+Builds a synthetic dataset of details the way they're read from stores, every record
+with its own copies of strings as unpickling makes them, and reports the bytes
+allocated by Python per record kept alive. Areas are not counted, since stores resolve
+them to the configured nodes.
+
+    python -m benchmarks.records [records]
+"""
+
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+
+from src.items import Detail
+
+
+@dataclass
+class LegacyCatalog(object):
+    """The former Catalog, without slots."""
+
+    detail_url: str
+    domain: str
+    name: str
+    provided_products: str
+
+
+@dataclass
+class LegacyDetail(LegacyCatalog):
+    """The former Detail, without slots."""
+
+    administrative_address: list[str] | None
+    bill: str
+    orders: str
+    fetched_at: float | None = None
+    content_hash: str | None = None
+    changes: int = 0
+
+
+_PRODUCTS = ["Widgets,Gadgets,Gizmos", "Plastic mould,blowing mould", "Valves,Pumps"]
+_BILLS = ["Below US$1 Million", "US$2.5 Million - US$5 Million", ""]
+_PATHS = [["泰州市"], ["泰州市", "泰兴市"], ["泰州市", "靖江市"], None]
+
+
+def _copy(text: str) -> str:
+    # a new string object of the same value, as unpickling every record makes.
+    return "".join(list(text))
+
+
+def synthetic_fields(i: int) -> tuple:
+    path = _PATHS[i % len(_PATHS)]
+    return (
+        _copy(f"https://supplier{i}.en.alibaba.com/company_profile.html"),
+        _copy(f"supplier{i}"),
+        _copy(f"Taizhou Supplier {i} Co., Ltd."),
+        _copy(_PRODUCTS[i % len(_PRODUCTS)]),
+        None if path is None else [_copy(name) for name in path],
+        _copy(_BILLS[i % len(_BILLS)]),
+        _copy(str(i % 100)),
+        1.7e9 + i,
+        _copy(f"{i:032x}"),
+    )
+
+
+def legacy_records(count: int) -> list[LegacyDetail]:
+    return [LegacyDetail(*synthetic_fields(i)) for i in range(count)]
+
+
+def compact_records(count: int) -> list[Detail]:
+    return [Detail(*synthetic_fields(i)) for i in range(count)]
+
+
+def measure(build: Callable[[int], list], count: int) -> float:
+    """Bytes allocated per record, by the records kept alive."""
+    tracemalloc.start()
+    records = build(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current / count
+
+
+def benchmark_main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    legacy = measure(legacy_records, count)
+    print(f"{count} records, legacy: {legacy:.0f} bytes per record")
+    compact = measure(compact_records, count)
+    print(
+        f"{count} records, compact: {compact:.0f} bytes per record "
+        f"({1 - compact / legacy:.0%} less)"
+    )
+
+
+if __name__ == "__main__":
+    benchmark_main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark of the compiled selectors against the former per-response XPaths.
+
+Parses every saved page in ``benchmarks/fixtures`` (``search*.html`` as catalog pages,
+``detail*.html`` as detail pages) and reports the time per page, both including and
+excluding building the lxml tree of the page. Real pages saved from the browser can be
+dropped into the directory as well.
+
+    python -m benchmarks.selectors [repeat]
+"""
+
+import sys
+import time
+from typing import Callable
+
+from scrapy.http import HtmlResponse
+
+from src.conf import CONFIG
+from src.util import CatalogSelector, DetailSelector
+
+from .pages import FIXTURES_DIR
+
+
+def legacy_catalog(response: HtmlResponse) -> list:
+    xpaths = CONFIG["xpath"]["catalog"]
+    response.xpath(xpaths["next-page-link"]).extract_first()
+    results = []
+    for card in response.xpath(xpaths["card"]):
+        results.append(
+            {
+                key: card.xpath(xpaths[key]).extract_first()
+                for key in ("detail-url", "name", "products")
+            }
+        )
+    return results
+
+
+def legacy_detail(response: HtmlResponse) -> dict:
+    result = {}
+    for key, xpaths in CONFIG["xpath"]["detail"].items():
+        result[key] = ""
+        for xpath in [xpaths] if isinstance(xpaths, str) else xpaths:
+            value = response.xpath(xpath).extract_first()
+            if value:
+                result[key] = value
+                break
+    return result
+
+
+def measure(
+    body: bytes,
+    parse: Callable[[HtmlResponse], object],
+    repeat: int,
+) -> tuple[float, float]:
+    """Seconds per page, including and excluding building the lxml tree."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(HtmlResponse(url="https://www.alibaba.com/", body=body, encoding="utf-8"))
+    total = (time.perf_counter() - start) / repeat
+
+    response = HtmlResponse(url="https://www.alibaba.com/", body=body, encoding="utf-8")
+    response.selector.root  # builds the tree
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(response)
+    return total, (time.perf_counter() - start) / repeat
+
+
+def benchmark_main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    catalog = CatalogSelector(CONFIG["xpath"]["catalog"])
+    detail = DetailSelector(CONFIG["xpath"]["detail"])
+
+    def compiled_catalog(response: HtmlResponse) -> list:
+        catalog.next_page(response.selector.root)
+        return catalog.cards(response.selector.root)
+
+    def compiled_detail(response: HtmlResponse) -> dict:
+        return detail.extract(response.selector.root)
+
+    cases = [
+        ("search*.html", legacy_catalog, compiled_catalog),
+        ("detail*.html", legacy_detail, compiled_detail),
+    ]
+    for pattern, legacy, compiled in cases:
+        for path in sorted(FIXTURES_DIR.glob(pattern)):
+            body = path.read_bytes()
+            response = HtmlResponse(url="https://www.alibaba.com/", body=body)
+            assert legacy(response) == compiled(response), f"mismatch on {path.name}"
+
+            before, before_extract = measure(body, legacy, repeat)
+            after, after_extract = measure(body, compiled, repeat)
+            print(
+                f"{path.name}: legacy {before * 1000:.2f} ms/page "
+                f"({before_extract * 1000:.3f} ms extracting), "
+                f"compiled {after * 1000:.2f} ms/page "
+                f"({after_extract * 1000:.3f} ms extracting, "
+                f"{before_extract / after_extract:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    benchmark_main()
@@ -0,0 +1,108 @@
+"""
+Benchmark of exporting the sheet of an area: the former SheetWriter, inserting rows
+into a DataFrame and writing the workbook at exit, against the streaming writers.
+
+Reports the time of exporting to a temporary file, and the peak memory allocated by
+Python during the export.
+
+    python -m benchmarks.sheetwriter [records]
+"""
+
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Callable
+
+import pandas as pd
+
+from sheetwriter import CONSTANTS, HEADERS, WRITERS, detail_row
+from src.items import Detail
+
+
+class LegacySheetWriter(object):
+    """The former SheetWriter, inserting rows with ``DataFrame.loc``."""
+
+    def __init__(self, headers: OrderedDict[str, str]) -> None:
+        self._headers = headers
+        self._frame = pd.DataFrame(columns=headers.values())
+
+    def write(self, **kwargs: str) -> None:
+        default_values = ["" for _ in range(len(self._headers))]
+        for key, value in kwargs.items():
+            inserted = False
+            for i, header in enumerate(self._headers.keys()):
+                if header == key:
+                    default_values[i] = value
+                    inserted = True
+                    break
+            assert inserted, "unrecognized key"
+        self._frame.loc[len(self._frame.index)] = default_values
+
+    def fillcolumn(self, column: str, value: str) -> None:
+        self._frame[self._headers[column]] = value
+
+
+def synthetic_details(count: int) -> list[Detail]:
+    return [
+        Detail(
+            f"https://supplier{i}.en.alibaba.com/company_profile.html",
+            f"supplier{i}",
+            f"Taizhou Supplier {i} Co., Ltd.",
+            "Widgets,Gadgets,Gizmos",
+            ["泰州市", "泰兴市"] if i % 3 else None,
+            "US$2.5 Million - US$5 Million",
+            str(i % 100),
+        )
+        for i in range(count)
+    ]
+
+
+def measure(export: Callable[[], None]) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    export()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def benchmark_main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    details = synthetic_details(count)
+    directory = pathlib.Path(tempfile.mkdtemp())
+
+    def legacy() -> None:
+        writer = LegacySheetWriter(HEADERS)
+        for detail in details:
+            writer.write(**detail_row(detail))
+        for column, value in CONSTANTS.items():
+            writer.fillcolumn(column, value)
+        writer._frame.to_excel(directory / "legacy.xlsx", index=False)
+
+    elapsed, peak = measure(legacy)
+    print(f"{count} records, legacy: {elapsed:.3f} s, {peak / 2**20:.1f} MiB peak")
+
+    for extension, writer_type in WRITERS.items():
+
+        def streaming() -> None:
+            path = directory / f"streaming.{extension}"
+            with writer_type(path, HEADERS, CONSTANTS) as writer:
+                writer.writemany(detail_row(detail) for detail in details)
+
+        try:
+            elapsed, peak = measure(streaming)
+        except RuntimeError as e:  # optional dependencies.
+            print(f"{count} records, {extension}: skipped, {e}")
+            continue
+        print(
+            f"{count} records, {extension}: {elapsed:.3f} s, "
+            f"{peak / 2**20:.1f} MiB peak"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_main()
@@ -0,0 +1,104 @@
+"""
+Benchmark of crawler startup: the time to import the modules of the crawler, and the
+time from starting a crawler process to its first request.
+
+Imports are timed in fresh interpreters, taking the best of ``repeat`` runs. The first
+request is timed against the local mock of Alibaba (see :mod:`benchmarks.mockserver`):
+a crawler of catalogs is started in a subprocess in the ``hybrid`` fetch mode (see
+``crawler-config.toml``) with a temporary cache directory, and the time is taken when
+the server receives the first request, after which the crawler is terminated.
+
+    python -m benchmarks.startup [repeat]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from .mockserver import MockAlibaba
+
+# the configuration alone, as scripts import it; then everything a crawler imports.
+_IMPORTS = {
+    "configuration": "src.conf",
+    "middlewares": "src.middlewares",
+    "crawler": (
+        "src.settings, src.spiders, src.middlewares, src.pipelines, src.extensions"
+    ),
+}
+
+_IMPORT = """
+import time
+start = time.perf_counter()
+import {modules}
+print(time.perf_counter() - start)
+"""
+
+
+def import_seconds(modules: str) -> float:
+    """Seconds to import the modules in a fresh interpreter."""
+    code = _IMPORT.format(modules=modules)
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+    return float(output.strip())
+
+
+def first_request_seconds() -> float:
+    """Seconds from starting a crawler process to the first request it sends."""
+    mock = MockAlibaba(0.0, 1, cards=10, filler=100)
+    mock.start()
+    with tempfile.TemporaryDirectory() as cache:
+        start = time.perf_counter()
+        crawler = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.startup", "--crawl", mock.host],
+            env={**os.environ, "CRAWLER_CACHE_DIR": cache},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not mock.first_request.wait(timeout=120):
+                raise TimeoutError("the crawler sent no request in 120 seconds")
+            return time.perf_counter() - start
+        finally:
+            crawler.terminate()
+            crawler.wait()
+            mock.stop()
+
+
+def crawl(host: str) -> None:
+    """Crawls the mock server, until terminated by :func:`first_request_seconds`."""
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    from src.conf import CONFIG
+    from src.spiders.catalog import CatalogSpider
+
+    # pages are downloaded by Scrapy, and browsers are only needed on fallback.
+    CONFIG["chrome-driver"]["fetch-mode"] = "hybrid"
+
+    class MockCatalogSpider(CatalogSpider):
+        allowed_domains = ["127.0.0.1"]
+
+        def search_url(self, area, page=None):
+            url = f"http://{host}/trade/search?SearchText={area.address}"
+            return url if page is None else f"{url}&page={page}"
+
+    process = CrawlerProcess(get_project_settings())
+    process.crawl(MockCatalogSpider)
+    process.start()
+
+
+def benchmark_main() -> None:
+    if sys.argv[1:2] == ["--crawl"]:
+        crawl(sys.argv[2])
+        return
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, modules in _IMPORTS.items():
+        seconds = min(import_seconds(modules) for _ in range(repeat))
+        print(f"import {name}: {seconds * 1000:.0f} ms (best of {repeat})")
+    first = min(first_request_seconds() for _ in range(repeat))
+    print(f"first request: {first * 1000:.0f} ms (best of {repeat})")
+
+
+if __name__ == "__main__":
+    benchmark_main()
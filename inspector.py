@@ -1,25 +1,15 @@
-import pickle
-
-from src.conf import CACHE_DIR
-from src.items import Catalog, Detail
-from src.util import AdministrativeArea
+from src.storage import open_store
 
 
 def inspect_main() -> None:
     print("=== Catalogs ===")
-    with open(CACHE_DIR / "catalogs.pickle", "rb") as f:
-        data: dict[AdministrativeArea, list[Catalog]] = pickle.load(f)
-    for area, catalogs in data.items():
-        print(f"for area {area.name} ({len(catalogs)})")
-        # for catalog in catalogs:
-        #     print(f"\t{catalog}")
+    for area, count in open_store("catalogs").count_by_area().items():
+        print(f"for area {area.name} ({count})")
 
     print("=== Details ===")
-    with open(CACHE_DIR / "details.pickle", "rb") as f:
-        data: dict[AdministrativeArea, list[Detail]] = pickle.load(f)
-    for area, details in data.items():
-        print(f"for area {area.name} ({len(details)})")
-        # for detail in details:
+    for area, count in open_store("details").count_by_area().items():
+        print(f"for area {area.name} ({count})")
+        # for area, detail in open_store("details"):
         #     print(f"\t{detail}")
 
 
@@ -0,0 +1,27 @@
+from src.storage import open_store, store_partitions
+
+
+def merge_main() -> None:
+    """
+    Merges partitions of stores into the main stores.
+
+    Crawlers started with ``-a shard=i/n`` or ``-a areas=...`` (in multiple processes,
+    or on multiple machines whose cache directories are then copied together) write
+    their own partitions of stores, as do crawlers sharing the frontier (see the
+    ``frontier`` section of configuration). Run this after they finish, to get the
+    combined dataset for ``inspector.py`` and ``sheetwriter.py``. Records already in
+    the main stores are superseded by the merged ones of the same area and key.
+    """
+    for name in ("catalogs", "details"):
+        store = open_store(name)
+        for partition in store_partitions(name):
+            count = 0
+            for area, record in open_store(name, partition):
+                store.append(area, record)
+                count += 1
+            print(f"=== Merged {count} {name} from partition {partition} ===")
+        store.close()
+
+
+if __name__ == "__main__":
+    merge_main()
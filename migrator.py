@@ -0,0 +1,35 @@
+import sys
+
+from src.conf import CACHE_DIR
+from src.storage import ItemStore, RecordLogStore, SnapshotStore, open_store
+
+
+def migrate_main() -> None:
+    """
+    Imports existing caches into the storage backend of configuration.
+
+    The source is either ``pickle`` (the legacy caches, by default) or ``log`` (the
+    record logs), e.g. ``python migrator.py log`` after switching the backend to
+    ``sqlite``.
+    """
+    source = sys.argv[1] if len(sys.argv) > 1 else "pickle"
+    for name in ("catalogs", "details"):
+        match source:
+            case "pickle":
+                origin: ItemStore = SnapshotStore(CACHE_DIR / f"{name}.pickle")
+            case "log":
+                origin = RecordLogStore(CACHE_DIR / f"{name}.log")
+            case _:
+                raise ValueError(f"unknown source {source!r}")
+
+        store = open_store(name)
+        count = 0
+        for area, record in origin:
+            store.append(area, record)
+            count += 1
+        store.close()
+        print(f"=== Imported {count} {name} from {source} ===")
+
+
+if __name__ == "__main__":
+    migrate_main()
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+from merger import merge_main
+
+
+def replay_main() -> None:
+    """
+    Parses the pages in the page cache again, without network.
+
+    ``python replayer.py detail 8`` starts eight processes of the detail spider in
+    replay mode, each parsing a shard of the pages saved by the spider, then merges
+    their partitions of stores into the main stores. Requests are scheduled by the
+    default scheduler of Scrapy even if the shared frontier is enabled, since the
+    frontier has seen all the pages.
+    """
+    spider = sys.argv[1]
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    workers = [
+        subprocess.Popen(
+            [
+                *(sys.executable, "-m", "scrapy", "crawl", spider),
+                *("-a", f"shard={i}/{processes}"),
+                *("-s", "PAGE_CACHE_MODE=replay"),
+                *("-s", "CONCURRENT_REQUESTS=16"),
+                *("-s", "SCHEDULER=scrapy.core.scheduler.Scheduler"),
+                *("-s", "DUPEFILTER_CLASS=scrapy.dupefilters.RFPDupeFilter"),
+            ]
+        )
+        for i in range(processes)
+    ]
+    failed = [i for i, worker in enumerate(workers) if worker.wait() != 0]
+    assert not failed, f"replay of shards {failed} failed"
+    merge_main()
+
+
+if __name__ == "__main__":
+    replay_main()
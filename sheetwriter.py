@@ -1,116 +1,238 @@
+import csv
+import os
 import pathlib
-import pickle
-import weakref
+import sys
+from abc import ABC, abstractmethod
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Self, override
 
-import pandas as pd
+from openpyxl import Workbook
 
-from src.conf import CACHE_DIR, SHEET_DIR
+from src.conf import SHEET_DIR
 from src.items import Detail
+from src.storage import open_store
 from src.util import AdministrativeArea
 
+HEADERS = OrderedDict(
+    orderdate="订单日期\n（格式：YYYYMMDD）",
+    name="营业单位\n（中文名称）",
+    domain="店铺名称",
+    city="市",
+    district="区县",
+    port="指运港/抵运岗\n（海关港口代码）",
+    typ="进出口类型\n(I:进口，E:出口)",
+    destination="运抵国/贸易国\n（海关国别代码）",
+    supervise="监管方式\n（海关监管代码）",
+    code="海关编码\n（申报海关代码）",
+    transport="运输方式\n（运输方式代码）",
+    hs="HS编码\n（10位商品编码）",
+    orders="订单数",
+    bills="销售额",
+    currency="币种\n（币种代码）",
+    platform="平台名称\n（数据来源平台名称）",
+    provide="经营范围",
+)
+
+CONSTANTS = {"currency": "美元", "platform": "阿里巴巴国际站"}
+
+
+class SheetWriter(ABC):
+    """
+    Streams rows of a sheet to file, so that memory does not grow with the rows.
+
+    Keys of rows are the keys of ``headers``, whose values are the column titles in the
+    sheet. Missing keys of a row are left empty, except for the ``constants`` filling
+    whole columns. The file is complete only after :meth:`close`, which is called when
+    leaving the ``with`` block.
+    """
+
+    path: pathlib.Path
+    headers: OrderedDict[str, str]
+    constants: dict[str, str]
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        headers: OrderedDict[str, str],
+        constants: dict[str, str] | None = None,
+    ) -> None:
+        self.path = path
+        self.headers = headers
+        self.constants = constants or {}
+        assert self.constants.keys() <= headers.keys(), "unrecognized key"
 
-class SheetWriter(object):
-    _path: pathlib.Path
-    _headers: OrderedDict[str, str]
-    _frame: pd.DataFrame
-    _finalizer: weakref.finalize
-
-    def __init__(self, path: pathlib.Path, headers: OrderedDict[str, str]) -> None:
-        self._path = path
-        self._headers = headers
-        self._frame = pd.DataFrame(columns=headers.values())
+    def write(self, **kwargs: str) -> None:
+        assert kwargs.keys() <= self.headers.keys(), "unrecognized key"
+        row = {**kwargs, **self.constants}
+        self._write_row([row.get(key, "") for key in self.headers.keys()])
 
-        # write to file when program exits
-        def finalizer(frame: pd.DataFrame, path: pathlib.Path) -> None:
-            frame.to_excel(path, index=False)
+    def writemany(self, rows: Iterable[dict[str, str]]) -> None:
+        for row in rows:
+            self.write(**row)
 
-        self._finalizer = weakref.finalize(self, finalizer, self._frame, self._path)
+    @abstractmethod
+    def close(self) -> None: ...
 
-    def write(self, **kwargs: str) -> None:
-        default_values = ["" for _ in range(len(self._headers))]
-        for key, value in kwargs.items():
-            inserted = False
-            for i, header in enumerate(self._headers.keys()):
-                if header == key:
-                    default_values[i] = value
-                    inserted = True
-                    break
-            assert inserted, "unrecognized key"
-        self._frame.loc[len(self._frame.index)] = default_values
-
-    def fillcolumn(self, column: str, value: str) -> None:
-        assert column in self._headers.keys(), "unrecognized key"
-        self._frame[self._headers[column]] = value
+    @abstractmethod
+    def _write_row(self, values: list[str]) -> None: ...
 
+    def __enter__(self) -> Self:
+        return self
 
-def sheetwriter_main() -> None:
-    headers = OrderedDict(
-        orderdate="订单日期\n（格式：YYYYMMDD）",
-        name="营业单位\n（中文名称）",
-        domain="店铺名称",
-        city="市",
-        district="区县",
-        port="指运港/抵运岗\n（海关港口代码）",
-        typ="进出口类型\n(I:进口，E:出口)",
-        destination="运抵国/贸易国\n（海关国别代码）",
-        supervise="监管方式\n（海关监管代码）",
-        code="海关编码\n（申报海关代码）",
-        transport="运输方式\n（运输方式代码）",
-        hs="HS编码\n（10位商品编码）",
-        orders="订单数",
-        bills="销售额",
-        currency="币种\n（币种代码）",
-        platform="平台名称\n（数据来源平台名称）",
-        provide="经营范围",
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class XlsxSheetWriter(SheetWriter):
+    """Writes rows into a write-only workbook, which is saved on :meth:`close`."""
+
+    _workbook: Workbook
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+        self._sheet.append(list(self.headers.values()))
+
+    @override
+    def close(self) -> None:
+        self._workbook.save(self.path)
+
+    @override
+    def _write_row(self, values: list[str]) -> None:
+        self._sheet.append(values)
+
+
+class CsvSheetWriter(SheetWriter):
+    """Writes rows into a UTF-8 CSV file, with BOM for Excel to recognize."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._file = open(self.path, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.headers.values())
+
+    @override
+    def close(self) -> None:
+        self._file.close()
+
+    @override
+    def _write_row(self, values: list[str]) -> None:
+        self._writer.writerow(values)
+
+
+class ParquetSheetWriter(SheetWriter):
+    """
+    Writes rows into a Parquet file, a row group every ``batch_size`` rows.
+
+    Requires ``pyarrow``, which is not installed by default.
+    """
+
+    batch_size: int = 10000
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise RuntimeError("install pyarrow to export Parquet files") from e
+
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema(
+            [(title, pyarrow.string()) for title in self.headers.values()]
+        )
+        self._writer = pyarrow.parquet.ParquetWriter(self.path, self._schema)
+        self._columns: list[list[str]] = [[] for _ in self.headers]
+
+    @override
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+    @override
+    def _write_row(self, values: list[str]) -> None:
+        for column, value in zip(self._columns, values):
+            column.append(value)
+        if len(self._columns[0]) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._columns[0]:
+            return
+        table = self._pyarrow.Table.from_arrays(self._columns, schema=self._schema)
+        self._writer.write_table(table)
+        self._columns = [[] for _ in self.headers]
+
+
+WRITERS: dict[str, type[SheetWriter]] = {
+    "xlsx": XlsxSheetWriter,
+    "csv": CsvSheetWriter,
+    "parquet": ParquetSheetWriter,
+}
+
+
+def detail_row(detail: Detail) -> dict[str, str]:
+    """Row of a detail in sheets. Areas are empty if the detail is not located."""
+    city = ""
+    district = ""
+    if detail.administrative_address:
+        city = detail.administrative_address[0]
+        if len(detail.administrative_address) > 1:
+            district = detail.administrative_address[1]
+    return dict(
+        name=detail.name,
+        domain=detail.domain,
+        city=city,
+        district=district,
+        orders=detail.orders,
+        bills=detail.bill,
+        provide=detail.provided_products,
     )
 
-    with open(CACHE_DIR / "details.pickle", "rb") as f:
-        data: dict[AdministrativeArea, list[Detail]] = pickle.load(f)
 
-    original = SHEET_DIR / "未筛选"
-    filtered = SHEET_DIR / "已筛选"
+def export_area(area: AdministrativeArea, extension: str) -> int:
+    """
+    Exports sheets of an area by streaming its details from the store. Returns the
+    number of details exported.
+
+    The filtered sheet contains only details located in the area trees.
+    """
+    writer = WRITERS[extension]
+    original = SHEET_DIR / "未筛选" / f"{area.name}.{extension}"
+    filtered = SHEET_DIR / "已筛选" / f"{area.name}.{extension}"
+
+    count = 0
+    with (
+        writer(original, HEADERS, CONSTANTS) as u,
+        writer(filtered, HEADERS, CONSTANTS) as f,
+    ):
+        for detail in open_store("details").of_area(area):
+            row = detail_row(detail)
+            u.write(**row)
+            if detail.administrative_address:
+                f.write(**row)
+            count += 1
+    return count
 
-    if not original.exists():
-        original.mkdir(parents=True)
-    if not filtered.exists():
-        filtered.mkdir(parents=True)
 
-    for area, details in data.items():
-        u = SheetWriter(original / f"{area.name}.xlsx", headers)
-        f = SheetWriter(filtered / f"{area.name}.xlsx", headers)
-        for detail in details:
-            if detail.administrative_address:
-                city = detail.administrative_address[0]
-                if len(detail.administrative_address) > 1:
-                    district = detail.administrative_address[1]
-                else:
-                    district = ""
-                f.write(
-                    name=detail.name,
-                    domain=detail.domain,
-                    city=city,
-                    district=district,
-                    orders=detail.orders,
-                    bills=detail.bill,
-                    provide=detail.provided_products,
-                )
-            else:
-                city = ""
-                district = ""
-            u.write(
-                name=detail.name,
-                domain=detail.domain,
-                city=city,
-                district=district,
-                orders=detail.orders,
-                bills=detail.bill,
-                provide=detail.provided_products,
-            )
-        u.fillcolumn("currency", "美元")
-        u.fillcolumn("platform", "阿里巴巴国际站")
-        f.fillcolumn("currency", "美元")
-        f.fillcolumn("platform", "阿里巴巴国际站")
+def sheetwriter_main() -> None:
+    extension = sys.argv[1] if len(sys.argv) > 1 else "xlsx"
+    assert extension in WRITERS.keys(), f"unsupported format {extension!r}"
+
+    for directory in (SHEET_DIR / "未筛选", SHEET_DIR / "已筛选"):
+        if not directory.exists():
+            directory.mkdir(parents=True)
+
+    # every area is exported by its own process, streaming the area from the store, so
+    # that details are never held in memory all at once nor sent between processes.
+    areas = list(open_store("details").count_by_area().keys())
+    workers = max(1, min(len(areas), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        counts = executor.map(export_area, areas, [extension] * len(areas))
+        for area, count in zip(areas, counts):
+            print(f"=== Exported {count} records in area {area.name} ===")
 
 
 if __name__ == "__main__":
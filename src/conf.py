@@ -1,16 +1,40 @@
+import os
 import pathlib
-
-import toml
+from collections.abc import Iterator, Mapping
+from functools import cache
+from typing import Any
 
 __all__ = ["PROJECT_DIR", "CONFIG"]
 
 PROJECT_DIR = pathlib.Path(__file__).parent.parent.absolute()
-CACHE_DIR = PROJECT_DIR / "cache"
+
+# created by whatever writes into them first. The cache directory can be moved with the
+# environment variable `CRAWLER_CACHE_DIR`, e.g. for benchmarks not to touch real data.
+CACHE_DIR = pathlib.Path(os.environ.get("CRAWLER_CACHE_DIR", PROJECT_DIR / "cache"))
 SHEET_DIR = PROJECT_DIR / "sheet"
 
-if not CACHE_DIR.exists():
-    CACHE_DIR.mkdir(parents=True)
-if not SHEET_DIR.exists():
-    SHEET_DIR.mkdir(parents=True)
 
-CONFIG = toml.load(PROJECT_DIR / "crawler-config.toml")
+class _LazyConfig(Mapping[str, Any]):
+    """
+    Configuration parsed from ``crawler-config.toml`` on first access rather than on
+    import, so that importing modules (e.g. scripts not crawling) costs nothing.
+    """
+
+    def __getitem__(self, key: str) -> Any:
+        return _load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_load())
+
+    def __len__(self) -> int:
+        return len(_load())
+
+
+@cache
+def _load() -> dict[str, Any]:
+    import toml
+
+    return toml.load(PROJECT_DIR / "crawler-config.toml")
+
+
+CONFIG = _LazyConfig()
@@ -0,0 +1,244 @@
+import bisect
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Self
+
+from scrapy import Item, Spider, signals
+from scrapy.crawler import Crawler
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Request
+from twisted.internet import task
+
+from ..conf import CACHE_DIR, CONFIG
+from ..signals import captcha_detected, stage_timed
+from ..util import domain_group
+
+__all__ = ["TelemetryExtension", "timed"]
+
+# upper bounds of histogram buckets in seconds, from XPath evaluation to captcha waits.
+_BUCKETS = (
+    *(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+    *(1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+
+
+@contextmanager
+def timed(crawler: Crawler, stage: str) -> Iterator[None]:
+    """Sends :data:`src.signals.stage_timed` with the seconds the block takes."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        crawler.signals.send_catch_log(stage_timed, stage=stage, seconds=seconds)
+
+
+class _Histogram(object):
+    """Latencies of a stage, counted in cumulative buckets as Prometheus does."""
+
+    counts: list[int]
+    count: int
+    sum: float
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_BUCKETS) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the quantile."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        result, seen = [], 0
+        for bound, count in zip((*map(str, _BUCKETS), "+Inf"), self.counts):
+            seen += count
+            result.append((bound, seen))
+        return result
+
+
+class TelemetryExtension(object):
+    """
+    Where the time of a crawl goes, as it goes.
+
+    Components time their stages with :func:`timed` (browser navigation, captcha waits,
+    rendering, XPath evaluation, pipelines, etc.), and latencies are counted in a
+    histogram per stage. Scraped items are counted per area, and captcha hits per
+    domain.
+
+    Every ``interval`` seconds (see the ``telemetry`` section of configuration), and
+    when the spider closes, the p50, p99, mean and count of every stage, items per
+    minute of every area in the interval, and captcha counts are set in stats (under
+    ``telemetry/``), and written to a file in ``cache/telemetry/`` in the ``format`` of
+    ``json`` or ``prometheus`` (the text exposition format, for the node exporter's
+    textfile collector or simply ``cat``).
+    """
+
+    crawler: Crawler
+    interval: float
+    format: str
+    histograms: dict[str, _Histogram]
+    items: dict[str, int]
+    captcha: dict[str, int]
+    _last_items: dict[str, int]
+    _last_emitted: float
+    _started: float
+    _task: task.LoopingCall | None
+
+    def __init__(self, crawler: Crawler, interval: float, format: str) -> None:
+        assert format in ("json", "prometheus"), f"unknown telemetry format {format!r}"
+        self.crawler = crawler
+        self.interval = interval
+        self.format = format
+        self.histograms = {}
+        self.items = {}
+        self.captcha = {}
+        self._last_items = {}
+        self._last_emitted = self._started = time.monotonic()
+        self._task = None
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        options = CONFIG.get("telemetry", {})
+        if not options.get("enabled", False):
+            raise NotConfigured
+        extension = cls(
+            crawler,
+            options.get("interval", 60.0),
+            options.get("format", "json"),
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(extension.stage_timed, signal=stage_timed)
+        crawler.signals.connect(extension.captcha_detected, signal=captcha_detected)
+        return extension
+
+    def spider_opened(self, spider: Spider) -> None:
+        self._last_emitted = self._started = time.monotonic()
+        self._task = task.LoopingCall(self.emit, spider)
+        self._task.start(self.interval, now=False)
+
+    def spider_closed(self, spider: Spider) -> None:
+        if self._task is not None and self._task.running:
+            self._task.stop()
+        self.emit(spider)
+
+    def stage_timed(self, stage: str, seconds: float) -> None:
+        if stage not in self.histograms.keys():
+            self.histograms[stage] = _Histogram()
+        self.histograms[stage].observe(seconds)
+
+    def item_scraped(self, item: Item, spider: Spider) -> None:
+        area = item.get("area")
+        name = area.address if area is not None else "-"
+        self.items[name] = self.items.get(name, 0) + 1
+
+    def captcha_detected(self, request: Request, spider: Spider) -> None:
+        domain = domain_group(request.url)
+        self.captcha[domain] = self.captcha.get(domain, 0) + 1
+
+    def emit(self, spider: Spider) -> None:
+        now = time.monotonic()
+        minutes = max(now - self._last_emitted, 1e-3) / 60
+        rates = {
+            area: round((count - self._last_items.get(area, 0)) / minutes, 2)
+            for area, count in self.items.items()
+        }
+        self._last_items = dict(self.items)
+        self._last_emitted = now
+
+        stats = self.crawler.stats
+        for stage, histogram in self.histograms.items():
+            stats.set_value(f"telemetry/{stage}/count", histogram.count)
+            stats.set_value(f"telemetry/{stage}/mean", self._mean(histogram))
+            stats.set_value(f"telemetry/{stage}/p50", histogram.quantile(0.5))
+            stats.set_value(f"telemetry/{stage}/p99", histogram.quantile(0.99))
+        for area, rate in rates.items():
+            stats.set_value(f"telemetry/items-per-minute/{area}", rate)
+        for domain, count in self.captcha.items():
+            stats.set_value(f"telemetry/captcha/{domain}", count)
+
+        name = ".".join(filter(None, [spider.name, _partition_name(spider)]))
+        suffix, text = ("json", self._json(rates))
+        if self.format == "prometheus":
+            suffix, text = ("prom", self._prometheus(spider.name, rates))
+        _write(CACHE_DIR / "telemetry" / f"{name}.{suffix}", text)
+
+    def _json(self, rates: dict[str, float]) -> str:
+        return json.dumps(
+            {
+                "uptime": round(time.monotonic() - self._started, 3),
+                "stages": {
+                    stage: {
+                        "count": histogram.count,
+                        "sum": round(histogram.sum, 6),
+                        "mean": self._mean(histogram),
+                        "p50": histogram.quantile(0.5),
+                        "p99": histogram.quantile(0.99),
+                        "buckets": dict(histogram.cumulative()),
+                    }
+                    for stage, histogram in self.histograms.items()
+                },
+                "items": self.items,
+                "items-per-minute": rates,
+                "captcha": self.captcha,
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+
+    def _prometheus(self, spider: str, rates: dict[str, float]) -> str:
+        lines = ["# TYPE crawler_stage_seconds histogram"]
+        for stage, histogram in self.histograms.items():
+            labels = f'spider="{spider}",stage="{stage}"'
+            for bound, count in histogram.cumulative():
+                lines.append(
+                    f'crawler_stage_seconds_bucket{{{labels},le="{bound}"}} {count}'
+                )
+            lines.append(f"crawler_stage_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"crawler_stage_seconds_count{{{labels}}} {histogram.count}")
+        lines.append("# TYPE crawler_items_total counter")
+        for area, count in self.items.items():
+            labels = f'spider="{spider}",area="{area}"'
+            lines.append(f"crawler_items_total{{{labels}}} {count}")
+        lines.append("# TYPE crawler_items_per_minute gauge")
+        for area, rate in rates.items():
+            labels = f'spider="{spider}",area="{area}"'
+            lines.append(f"crawler_items_per_minute{{{labels}}} {rate}")
+        lines.append("# TYPE crawler_captcha_total counter")
+        for domain, count in self.captcha.items():
+            labels = f'spider="{spider}",domain="{domain}"'
+            lines.append(f"crawler_captcha_total{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _mean(histogram: _Histogram) -> float:
+        return round(histogram.sum / histogram.count, 6) if histogram.count else 0.0
+
+
+def _partition_name(spider: Spider) -> str | None:
+    partition = getattr(spider, "partition", None)
+    return partition.name if partition is not None else None
+
+
+def _write(path: os.PathLike, text: str) -> None:
+    # written aside and renamed, so readers never see a half-written file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp, path)
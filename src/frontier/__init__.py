@@ -0,0 +1,3 @@
+from .queue import *  # noqa: F403
+from .dupefilter import *  # noqa: F403
+from .scheduler import *  # noqa: F403
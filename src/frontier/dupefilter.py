@@ -0,0 +1,41 @@
+import logging
+from typing import Self
+
+from scrapy import Request, Spider
+from scrapy.crawler import Crawler
+from scrapy.dupefilters import BaseDupeFilter
+
+from .queue import SqliteFrontier, open_frontier
+
+__all__ = ["SharedDupeFilter"]
+
+logger = logging.getLogger(__name__)
+
+
+class SharedDupeFilter(BaseDupeFilter):
+    """
+    Filters requests whose fingerprints are recorded in the shared frontier, so that a
+    page is requested once among all crawler processes, and across restarts.
+    """
+
+    crawler: Crawler
+    frontier: SqliteFrontier
+
+    def __init__(self, crawler: Crawler, frontier: SqliteFrontier) -> None:
+        self.crawler = crawler
+        self.frontier = frontier
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        return cls(crawler, open_frontier())
+
+    def request_seen(self, request: Request) -> bool:
+        fingerprint = self.crawler.request_fingerprinter.fingerprint(request)
+        return self.frontier.seen(fingerprint.hex())
+
+    def close(self, reason: str) -> None:
+        self.frontier.close()
+
+    def log(self, request: Request, spider: Spider) -> None:
+        logger.debug("Filtered duplicate request: %(request)s", {"request": request})
+        self.crawler.stats.inc_value("dupefilter/filtered")
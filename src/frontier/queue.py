@@ -0,0 +1,241 @@
+import os
+import pathlib
+import pickle
+import socket
+import sqlite3
+import time
+from typing import Any, Callable
+
+from ..conf import CACHE_DIR, CONFIG
+
+__all__ = ["SqliteFrontier", "open_frontier", "frontier_worker", "FRONTIER_ID"]
+
+# key of request meta holding the row of the frontier the request was leased from.
+FRONTIER_ID = "frontier_id"
+
+_PENDING = 0
+_LEASED = 1
+_DEAD = 2
+
+
+class SqliteFrontier(object):
+    """
+    Queues of requests and fingerprints of seen requests in a SQLite database, shared by
+    crawler processes on the same machine.
+
+    Requests are stored as the dicts of :meth:`scrapy.Request.to_dict`, in queues named
+    after the spiders. :meth:`lease` hands the request of the highest priority in a
+    queue to one process for ``lease_timeout`` seconds. The request is deleted when the
+    process :meth:`ack` it; otherwise, the lease expires and the request is handed out
+    again, so requests of crashed processes are not lost. A request whose lease expired
+    ``max_attempts`` times, or that is buried by :meth:`bury`, is dead and never handed
+    out again.
+
+    Requests may be pushed with a ``key`` (e.g. the supplier of a detail page), with
+    which a pending request is updated by :meth:`extend` instead of pushing another.
+    """
+
+    path: pathlib.Path
+    lease_timeout: float
+    max_attempts: int
+    worker: str
+    _connection: sqlite3.Connection
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        *,
+        lease_timeout: float = 300.0,
+        max_attempts: int = 3,
+    ) -> None:
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+
+        # transactions are begun explicitly, so that leasing takes the write lock
+        # before reading the queue.
+        self._connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def seen(self, fingerprint: str) -> bool:
+        """Records the fingerprint, and returns whether it was recorded before."""
+        cursor = self._connection.execute(
+            "INSERT OR IGNORE INTO fingerprints (fingerprint) VALUES (?)",
+            (fingerprint,),
+        )
+        return cursor.rowcount == 0
+
+    def push(
+        self,
+        queue: str,
+        request: dict[str, Any],
+        priority: int = 0,
+        key: str | None = None,
+    ) -> None:
+        self._connection.execute(
+            "INSERT INTO requests (queue, priority, payload, state, attempts, key) "
+            "VALUES (?, ?, ?, ?, 0, ?)",
+            (queue, priority, pickle.dumps(request), _PENDING, key),
+        )
+
+    def extend(
+        self,
+        queue: str,
+        key: str,
+        update: Callable[[dict[str, Any]], dict[str, Any]],
+    ) -> bool:
+        """
+        Replaces the pending request of the key in the queue with ``update`` of it.
+        Returns whether there's one; leased requests are not updated.
+        """
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._connection.execute(
+                "SELECT id, payload FROM requests WHERE queue = ? AND key = ? "
+                "AND state = ? LIMIT 1",
+                (queue, key, _PENDING),
+            ).fetchone()
+            if row is not None:
+                request = update(pickle.loads(row[1]))
+                self._connection.execute(
+                    "UPDATE requests SET payload = ? WHERE id = ?",
+                    (pickle.dumps(request), row[0]),
+                )
+            self._connection.execute("COMMIT")
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        return row is not None
+
+    def requeue(self, id: int, request: dict[str, Any], priority: int = 0) -> None:
+        """
+        Puts a leased request back to its queue, replaced by ``request`` (e.g. a retry
+        of it). The attempts of the request are kept.
+        """
+        self._connection.execute(
+            "UPDATE requests SET priority = ?, payload = ?, state = ?, worker = NULL "
+            "WHERE id = ?",
+            (priority, pickle.dumps(request), _PENDING, id),
+        )
+
+    def lease(self, queue: str) -> tuple[int, dict[str, Any]] | None:
+        """Leases the next request of the queue, with the id to :meth:`ack` it."""
+        now = time.time()
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._bury(queue, now)
+            row = self._connection.execute(
+                "SELECT id, payload FROM requests WHERE queue = ? "
+                "AND (state = ? OR (state = ? AND lease_until < ?)) "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (queue, _PENDING, _LEASED, now),
+            ).fetchone()
+            if row is not None:
+                self._connection.execute(
+                    "UPDATE requests SET state = ?, lease_until = ?, worker = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (_LEASED, now + self.lease_timeout, self.worker, row[0]),
+                )
+            self._connection.execute("COMMIT")
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return row[0], pickle.loads(row[1])
+
+    def ack(self, id: int) -> None:
+        """Marks a leased request as done."""
+        self._connection.execute("DELETE FROM requests WHERE id = ?", (id,))
+
+    def bury(self, id: int) -> None:
+        """Marks a leased request as dead, e.g. when it failed for good."""
+        self._connection.execute(
+            "UPDATE requests SET state = ?, worker = NULL WHERE id = ?",
+            (_DEAD, id),
+        )
+
+    def available(self, queue: str) -> bool:
+        """Whether there's a request of the queue to lease now."""
+        row = self._connection.execute(
+            "SELECT EXISTS (SELECT 1 FROM requests WHERE queue = ? "
+            "AND (state = ? OR (state = ? AND lease_until < ? AND attempts < ?)))",
+            (queue, _PENDING, _LEASED, time.time(), self.max_attempts),
+        ).fetchone()
+        return bool(row[0])
+
+    def unfinished(self, queue: str) -> int:
+        """Number of requests of the queue that are pending or leased."""
+        self._bury(queue, time.time())
+        (count,) = self._connection.execute(
+            "SELECT COUNT(*) FROM requests WHERE queue = ? AND state IN (?, ?)",
+            (queue, _PENDING, _LEASED),
+        ).fetchone()
+        return count
+
+    def dead(self, queue: str) -> int:
+        """Number of requests of the queue given up after ``max_attempts`` leases."""
+        (count,) = self._connection.execute(
+            "SELECT COUNT(*) FROM requests WHERE queue = ? AND state = ?",
+            (queue, _DEAD),
+        ).fetchone()
+        return count
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _bury(self, queue: str, now: float) -> None:
+        self._connection.execute(
+            "UPDATE requests SET state = ? WHERE queue = ? AND state = ? "
+            "AND lease_until < ? AND attempts >= ?",
+            (_DEAD, queue, _LEASED, now, self.max_attempts),
+        )
+
+    def _create_schema(self) -> None:
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS requests ("
+            "id INTEGER PRIMARY KEY, queue TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "payload BLOB NOT NULL, state INTEGER NOT NULL, lease_until REAL, "
+            "attempts INTEGER NOT NULL, worker TEXT, key TEXT)"
+        )
+        # keys were added after the table of previous versions was created.
+        info = self._connection.execute("PRAGMA table_info(requests)")
+        if "key" not in {row[1] for row in info}:
+            self._connection.execute("ALTER TABLE requests ADD COLUMN key TEXT")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS requests_queue "
+            "ON requests (queue, state, priority DESC, id)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS requests_key ON requests (queue, key)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints (fingerprint TEXT PRIMARY KEY) "
+            "WITHOUT ROWID"
+        )
+
+
+def open_frontier() -> SqliteFrontier:
+    """Opens the frontier specified in the ``frontier`` section of configuration."""
+    options: dict = CONFIG.get("frontier", {})
+    path = CACHE_DIR / options.get("path", "frontier.sqlite3")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return SqliteFrontier(
+        path,
+        lease_timeout=options.get("lease-timeout", 300.0),
+        max_attempts=options.get("max-attempts", 3),
+    )
+
+
+def frontier_worker() -> str | None:
+    """
+    Name of this process among the crawlers sharing the frontier, if it's enabled.
+    Crawlers of the same spider write stores of their own partitions (see
+    :attr:`src.util.Partition.worker`), merged by ``merger.py``.
+    """
+    if not CONFIG.get("frontier", {}).get("enabled", False):
+        return None
+    return str(os.getpid())
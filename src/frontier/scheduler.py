@@ -0,0 +1,160 @@
+import time
+from typing import Any, Callable, Self
+
+from scrapy import Request, Spider, signals
+from scrapy.core.scheduler import BaseScheduler
+from scrapy.crawler import Crawler
+from scrapy.dupefilters import BaseDupeFilter
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.misc import load_object
+from scrapy.utils.request import request_from_dict
+from twisted.python.failure import Failure
+
+from ..conf import CONFIG
+from .queue import FRONTIER_ID, SqliteFrontier, open_frontier
+
+__all__ = ["SharedScheduler"]
+
+
+class SharedScheduler(BaseScheduler):
+    """
+    Schedules requests through the shared frontier (see :class:`SqliteFrontier`),
+    instead of the memory of this process.
+
+    Requests of a spider are pushed to, and leased from, the queue named after the
+    spider, so processes of the same spider share the work. A request is acknowledged by
+    :class:`src.middlewares.FrontierMiddleware` once its response is parsed; requests
+    handed back by downloader middlewares (e.g. retries) replace their leased originals.
+    Requests that fail for good (e.g. retries exhausted, or ignored) are buried once
+    their errbacks return, counted as ``frontier/failed``, instead of staying leased
+    until the lease expires.
+
+    The spider is kept open while its queue, or any of its upstream queues (the
+    ``upstream`` option of the ``frontier`` section), has unfinished requests: requests
+    leased by other processes may be handed out again, and upstream spiders may feed
+    more requests. It's also kept open for ``idle-timeout`` seconds after the last
+    request it got, for upstream spiders started later.
+    """
+
+    crawler: Crawler
+    frontier: SqliteFrontier
+    dupefilter: BaseDupeFilter
+    spider: Spider
+    queue: str
+    upstream: list[str]
+    idle_timeout: float
+    _last_active: float
+
+    def __init__(
+        self,
+        crawler: Crawler,
+        frontier: SqliteFrontier,
+        dupefilter: BaseDupeFilter,
+    ) -> None:
+        self.crawler = crawler
+        self.frontier = frontier
+        self.dupefilter = dupefilter
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        dupefilter_cls = load_object(crawler.settings["DUPEFILTER_CLASS"])
+        if hasattr(dupefilter_cls, "from_crawler"):
+            dupefilter = dupefilter_cls.from_crawler(crawler)
+        else:
+            dupefilter = dupefilter_cls.from_settings(crawler.settings)
+        return cls(crawler, open_frontier(), dupefilter)
+
+    def open(self, spider: Spider) -> None:
+        self.spider = spider
+        self.queue = spider.name
+        options: dict = CONFIG.get("frontier", {})
+        self.upstream = options.get("upstream", {}).get(spider.name, [])
+        self.idle_timeout = options.get("idle-timeout", 60.0)
+        self._last_active = time.monotonic()
+        self.crawler.signals.connect(self.spider_idle, signal=signals.spider_idle)
+        self.dupefilter.open()
+
+    def close(self, reason: str) -> None:
+        dead = self.frontier.dead(self.queue)
+        if dead:
+            self.crawler.stats.set_value("frontier/dead", dead)
+        self.frontier.close()
+        self.dupefilter.close(reason)
+
+    def has_pending_requests(self) -> bool:
+        return self.frontier.available(self.queue)
+
+    def enqueue_request(self, request: Request) -> bool:
+        stats = self.crawler.stats
+        if isinstance(request.errback, _BuryOnFailure):
+            request = request.replace(errback=request.errback.errback)
+        payload = request.to_dict(spider=self.spider)
+        if FRONTIER_ID in request.meta:
+            self.frontier.requeue(request.meta[FRONTIER_ID], payload, request.priority)
+            stats.inc_value("frontier/requeued")
+            return True
+        if not request.dont_filter and self.dupefilter.request_seen(request):
+            self.dupefilter.log(request, self.spider)
+            return False
+        self.frontier.push(self.queue, payload, request.priority)
+        stats.inc_value("scheduler/enqueued")
+        return True
+
+    def next_request(self) -> Request | None:
+        leased = self.frontier.lease(self.queue)
+        if leased is None:
+            return None
+        id, payload = leased
+        request = request_from_dict(payload, spider=self.spider)
+        request.meta[FRONTIER_ID] = id
+        request.errback = _BuryOnFailure(self, id, request.errback)
+        self.crawler.stats.inc_value("scheduler/dequeued")
+        self._last_active = time.monotonic()
+        return request
+
+    def spider_idle(self, spider: Spider) -> None:
+        for queue in (self.queue, *self.upstream):
+            if self.frontier.unfinished(queue):
+                raise DontCloseSpider
+        if time.monotonic() - self._last_active < self.idle_timeout:
+            raise DontCloseSpider
+
+    def bury(self, id: int) -> None:
+        self.frontier.bury(id)
+        self.crawler.stats.inc_value("frontier/failed")
+
+
+class _BuryOnFailure(object):
+    """
+    Errback of a leased request, calling that of the request itself (if any) and then
+    burying the request. Downloads that fail and their errbacks skip spider
+    middlewares, so :class:`src.middlewares.FrontierMiddleware` never sees them.
+    """
+
+    scheduler: SharedScheduler
+    id: int
+    errback: Callable[[Failure], Any] | None
+
+    def __init__(
+        self,
+        scheduler: SharedScheduler,
+        id: int,
+        errback: Callable[[Failure], Any] | None,
+    ) -> None:
+        self.scheduler = scheduler
+        self.id = id
+        self.errback = errback
+
+    def __call__(self, failure: Failure) -> Any:
+        if self.errback is None:
+            self.scheduler.bury(self.id)
+            return failure  # logged by Scrapy, as without the errback.
+        output = self.errback(failure)
+        if output is not None and not isinstance(output, Failure):
+            output = list(output)
+            # derived requests do not inherit the lease, as in `FrontierMiddleware`.
+            for request in output:
+                if isinstance(request, Request):
+                    request.meta.pop(FRONTIER_ID, None)
+        self.scheduler.bury(self.id)
+        return output
@@ -1,11 +1,18 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import MISSING, dataclass, fields
+from typing import Any
 
 from scrapy import Field, Item
 
-__all__ = ["Catalog", "CatalogItem"]
+from ..util import supplier_identity
 
+__all__ = ["Catalog", "CatalogKey", "CatalogItem"]
 
-@dataclass
+# identity of a search result, see :attr:`Catalog.key`.
+CatalogKey = tuple[str, str, str, str]
+
+
+@dataclass(frozen=True, slots=True)
 class Catalog(object):
     """
     Search results from Alibaba's search engine.
@@ -13,6 +20,11 @@ class Catalog(object):
     Currently this dataclass contains some information about a supplier. An additional
     class :class:`CatalogItem` is introduced because Scrapy framework only recognize that,
     while we need this dataclass to be serialized with Pickle.
+
+    Records are immutable and slotted, as millions of them are kept in memory by
+    pipelines and scripts reading stores. Strings repeated across records (e.g.
+    products) are interned. The pickled state is the same dict of fields as that of the
+    former records without slots, so stores written by either are read by both.
     """
 
     detail_url: str
@@ -20,6 +32,45 @@ class Catalog(object):
     name: str
     provided_products: str
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "provided_products", _intern(self.provided_products))
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        # fields added later are absent in records pickled by previous versions.
+        values = {}
+        for field in fields(self):
+            if field.name in state.keys():
+                values[field.name] = state[field.name]
+            elif field.default is not MISSING:
+                values[field.name] = field.default
+        self.__init__(**values)
+
+    @property
+    def key(self) -> CatalogKey:
+        """
+        Hashable identity of this search result.
+
+        Records derived from a catalog (e.g. :class:`Detail`) share the same key, so
+        looking up whether a catalog has been crawled is a set membership test rather
+        than a scan over every crawled record.
+        """
+        return (self.detail_url, self.domain, self.name, self.provided_products)
+
+    @property
+    def supplier(self) -> str:
+        """
+        Identity of the supplier, see :func:`src.util.supplier_identity`. Catalogs of
+        the same supplier in different areas share one detail page.
+        """
+        return supplier_identity(self.detail_url, self.domain)
+
+
+def _intern[T](value: T) -> T:
+    return sys.intern(value) if isinstance(value, str) else value
+
 
 class CatalogItem(Item):
     """
@@ -1,28 +1,62 @@
 from dataclasses import dataclass
+from typing import Iterable
 
 from scrapy import Field, Item
 
-from ..util import AdministrativeArea
-from .catalog import Catalog
+from .catalog import Catalog, _intern
 
 __all__ = ["Detail", "DetailItem"]
 
+# administrative area paths of details, shared by the details in the same area.
+_paths: dict[tuple[str, ...], tuple[str, ...]] = {}
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Detail(Catalog):
-    administrative_address: list[AdministrativeArea] | None
+    """
+    Information on the company profile page of a supplier found in the catalogs.
+
+    ``fetched_at`` (UNIX time) and ``content_hash`` (of the fields extracted from the
+    page) tell when the page is stale and whether it changed when fetched again;
+    ``changes`` counts the times it changed. They're absent in records crawled by
+    previous versions.
+
+    ``administrative_address`` (names of areas from the root, see
+    :func:`src.util.search_administrative`) is a tuple shared by details of the same
+    path, converted from the lists of previous versions.
+    """
+
+    administrative_address: tuple[str, ...] | None
     bill: str
     orders: str
+    fetched_at: float | None = None
+    content_hash: str | None = None
+    changes: int = 0
+
+    # slotted dataclasses pickle fields as lists, unless the methods are defined.
+    __getstate__ = Catalog.__getstate__
+    __setstate__ = Catalog.__setstate__
+
+    def __post_init__(self) -> None:
+        Catalog.__post_init__(self)
+        set_field = object.__setattr__  # the dataclass is frozen.
+        set_field(self, "administrative_address", _path(self.administrative_address))
+        set_field(self, "bill", _intern(self.bill))
+        set_field(self, "orders", _intern(self.orders))
 
     def is_result_of(self, catalog: Catalog) -> bool:
-        return (
-            self.detail_url == catalog.detail_url
-            and self.domain == catalog.domain
-            and self.name == catalog.name
-            and self.provided_products == catalog.provided_products
-        )
+        return self.key == catalog.key
 
 
 class DetailItem(Item):
     detail = Field()
     area = Field()  # for classification and insertion into corresponding list
+
+
+def _path(names: Iterable[str] | None) -> tuple[str, ...] | None:
+    if names is None:
+        return None
+    path = tuple(names)
+    if path not in _paths.keys():
+        _paths[path] = tuple(_intern(name) for name in path)
+    return _paths[path]
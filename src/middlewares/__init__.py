@@ -1,2 +1,6 @@
 from .interactive import *  # noqa: F403
 from .useragent import *  # noqa: F403
+from .throttle import *  # noqa: F403
+from .frontier import *  # noqa: F403
+from .pagecache import *  # noqa: F403
+from .session import *  # noqa: F403
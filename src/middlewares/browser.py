@@ -0,0 +1,112 @@
+import weakref
+from typing import TYPE_CHECKING, Callable
+
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet import threads
+from twisted.internet.defer import Deferred, DeferredList, DeferredQueue
+from twisted.python.failure import Failure
+
+if TYPE_CHECKING:
+    from selenium.webdriver import Remote
+
+__all__ = ["BrowserPool"]
+
+
+class BrowserPool(object):
+    """
+    A fixed number of browser drivers, checked out by concurrent requests.
+
+    Checking out waits on a Twisted :class:`DeferredQueue`, so requests exceeding the
+    pool size wait without blocking the reactor. Drivers are launched and quit in the
+    reactor's thread pool, as Selenium calls are blocking.
+
+    Drivers are launched lazily, when requests check out while all launched ones are
+    busy, so crawls that never open a page in browsers never launch them. A driver
+    that raised (e.g. crashed, or timed out loading a page) is discarded with
+    :meth:`discard`, and a fresh one is launched when needed. If launching fails, the
+    error is raised to a waiting request.
+
+    Every driver is launched in a slot, from 0 to ``size - 1``, passed to the factory
+    (e.g. for each to have a browser profile of its own). A slot is taken again only
+    after its former driver has quit.
+    """
+
+    size: int
+    _factory: Callable[[int], "Remote"]
+    _drivers: dict["Remote", int]
+    _free: list[int]
+    _idle: DeferredQueue
+
+    def __init__(self, size: int, factory: Callable[[int], "Remote"]) -> None:
+        assert size > 0, "browser pool should contain at least one driver"
+        self.size = size
+        self._factory = factory
+        self._drivers = {}
+        self._free = list(range(size))
+        self._idle = DeferredQueue()
+        weakref.finalize(self, _quit_all, self._drivers)
+
+    async def acquire(self) -> "Remote":
+        driver = self._idle.get()
+        if not driver.called:
+            self._launch()
+        return await maybe_deferred_to_future(driver)
+
+    def release(self, driver: "Remote") -> None:
+        self._idle.put(driver)
+
+    def discard(self, driver: "Remote") -> None:
+        slot = self._drivers.pop(driver, None)
+        if slot is None:
+            return  # quit by `close` already.
+        quitted: Deferred = threads.deferToThread(_quit_quietly, driver)
+        quitted.addCallback(lambda _: self._vacate(slot))
+
+    def close(self) -> Deferred:
+        """Quits all drivers in the thread pool, firing the Deferred once they quit."""
+        quitted = [
+            threads.deferToThread(_quit_quietly, driver) for driver in self._drivers
+        ]
+        self._drivers.clear()
+        return DeferredList(quitted)
+
+    def _launch(self) -> None:
+        if not self._free:
+            return
+        slot = min(self._free)
+        self._free.remove(slot)
+        launched: Deferred = threads.deferToThread(self._factory, slot)
+        launched.addCallbacks(
+            self._launched,
+            self._failed,
+            callbackArgs=(slot,),
+            errbackArgs=(slot,),
+        )
+
+    def _launched(self, driver: "Remote", slot: int) -> None:
+        self._drivers[driver] = slot
+        self._idle.put(driver)
+
+    def _failed(self, failure: Failure, slot: int) -> None:
+        self._free.append(slot)
+        if self._idle.waiting:
+            self._idle.waiting.pop(0).errback(failure)
+        if self._idle.waiting:
+            self._launch()  # for the next one waiting.
+
+    def _vacate(self, slot: int) -> None:
+        self._free.append(slot)
+        if self._idle.waiting:
+            self._launch()
+
+
+def _quit_quietly(driver: "Remote") -> None:
+    try:
+        driver.quit()
+    except Exception:
+        pass  # the driver has probably crashed already.
+
+
+def _quit_all(drivers: dict["Remote", int]) -> None:
+    while drivers:
+        _quit_quietly(drivers.popitem()[0])
@@ -0,0 +1,65 @@
+from typing import Iterable, Self
+
+from scrapy import Request, Spider, signals
+from scrapy.crawler import Crawler
+from scrapy.http import Response
+
+from ..frontier import FRONTIER_ID, SqliteFrontier, open_frontier
+
+__all__ = ["FrontierMiddleware"]
+
+
+class FrontierMiddleware(object):
+    """
+    Spider middleware acknowledging requests leased from the shared frontier (see
+    :class:`src.frontier.SharedScheduler`).
+
+    A request is acknowledged after all the output of its callback is handled, so that
+    requests and items derived from it are in the frontier before it's considered done.
+    Derived requests do not inherit the lease of their parent, even if the meta is
+    copied. A request whose callback raises is buried, and so are requests that fail to
+    download (see :class:`src.frontier.SharedScheduler`).
+    """
+
+    frontier: SqliteFrontier
+
+    def __init__(self, frontier: SqliteFrontier) -> None:
+        self.frontier = frontier
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        middleware = cls(open_frontier())
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def process_spider_output(
+        self,
+        response: Response,
+        result: Iterable,
+        spider: Spider,
+    ) -> Iterable:
+        leased = response.meta.get(FRONTIER_ID)
+        try:
+            for output in result:
+                if isinstance(output, Request):
+                    output.meta.pop(FRONTIER_ID, None)
+                yield output
+        except Exception:
+            if leased is not None:
+                self.frontier.bury(leased)
+            raise
+        if leased is not None:
+            self.frontier.ack(leased)
+
+    def process_spider_exception(
+        self,
+        response: Response,
+        exception: Exception,
+        spider: Spider,
+    ) -> None:
+        leased = response.meta.get(FRONTIER_ID)
+        if leased is not None:
+            self.frontier.bury(leased)
+
+    def spider_closed(self, spider: Spider) -> None:
+        self.frontier.close()
@@ -1,58 +1,423 @@
+import json
+import pathlib
+import random
 import time
-import weakref
+from typing import TYPE_CHECKING, Callable, Self
 
-from scrapy import Request, Spider
-from scrapy.http import HtmlResponse, Response
-from selenium.webdriver import Chrome, ChromeOptions, ChromeService, Remote
+from scrapy import Request, Spider, signals
+from scrapy.crawler import Crawler
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import HtmlResponse, Response, TextResponse
+from scrapy.utils.defer import maybe_deferred_to_future
+from selenium.common import TimeoutException
+from twisted.internet import task, threads
+from twisted.internet.defer import Deferred
 
-from ..conf import CONFIG
+from ..conf import CACHE_DIR, CONFIG
+from ..extensions import timed
+from ..signals import captcha_detected, cookies_captured
+from ..storage import open_cookie_store
+from ..util import ExtractedResponse, domain_group
+from .browser import BrowserPool
+from .session import session_enabled
+from .useragent import user_agents
+
+# Selenium's webdriver takes a while to import, and is imported when browsers launch.
+if TYPE_CHECKING:
+    from selenium.webdriver import Remote
 
 __all__ = ["InteractiveMiddleware"]
 
+# XPaths of the configuration select text and attribute nodes as well, which are not
+# found by `find_element`, so they are evaluated by the browser directly.
+_MATCHES = """
+const result = document.evaluate(
+    arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+);
+return result.singleNodeValue !== null;
+"""
+
+# evaluates the `extraction_spec` of a selector into the fields of an `Extraction`, the
+# same as the selector does with lxml: elements are serialized, and only the first node
+# of each node-set is taken.
+_EXTRACT = """
+const spec = arguments[0];
+function first(xpath, context) {
+    const result = document.evaluate(xpath, context, null, XPathResult.ANY_TYPE, null);
+    switch (result.resultType) {
+        case XPathResult.STRING_TYPE: return result.stringValue;
+        case XPathResult.NUMBER_TYPE: return String(result.numberValue);
+        case XPathResult.BOOLEAN_TYPE: return String(result.booleanValue);
+    }
+    const node = result.iterateNext();
+    if (node === null) return null;
+    return node.nodeType === Node.ELEMENT_NODE ? node.outerHTML : node.nodeValue;
+}
+function record(context) {
+    const fields = {};
+    for (const [key, alternatives] of Object.entries(spec.fields)) {
+        // the first non-empty value, or an empty one if nothing else matched.
+        fields[key] = null;
+        for (const xpath of alternatives) {
+            const value = first(xpath, context);
+            if (value) {
+                fields[key] = value;
+                break;
+            }
+            fields[key] ??= value;
+        }
+    }
+    return fields;
+}
+const records = [];
+if (spec.card === null) {
+    records.push(record(document));
+} else {
+    const cards = document.evaluate(
+        spec.card, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    for (let i = 0; i < cards.snapshotLength; i++) {
+        records.push(record(cards.snapshotItem(i)));
+    }
+}
+const page = {};
+for (const [key, xpath] of Object.entries(spec.page)) {
+    page[key] = first(xpath, document);
+}
+return {records: records, page: page};
+"""
+
+# bytes transferred for the document and all resources loaded so far.
+_TRANSFERRED = """
+return performance.getEntriesByType("navigation")
+    .concat(performance.getEntriesByType("resource"))
+    .reduce((sum, entry) => sum + (entry.transferSize || 0), 0);
+"""
+
 
 class InteractiveMiddleware(object):
     """
     Interactively opens requested pages and returns the desired page to the engine.
 
-    Currently, Selenium is adopted to do so.
+    Currently, Selenium is adopted to do so. A pool of up to ``pool-size`` browsers (see
+    the ``chrome-driver`` section of configuration) serves requests concurrently, each
+    browser opening one page at a time; page loads run in the reactor's thread pool.
+    Browsers are launched on first use, so the crawl starts without waiting for them,
+    and each keeps a user-agent of Chrome for its whole session.
+
+    When the captcha catches a browser, the request waits for manual verification by
+    polling the browser every ``captcha-poll-interval`` seconds, while requests of other
+    browsers keep flowing. If the captcha is not passed within ``captcha-timeout``
+    seconds, the request is sent back to the scheduler and the browser is released. A
+    request timing out ``captcha-attempts`` times is given up (counted as
+    ``captcha/gave-up``), raising :class:`IgnoreRequest` to its errback.
+
+    With ``fetch-mode = "hybrid"``, requests are downloaded by Scrapy first, and only
+    fall back to browsers when the response is redirected to the captcha, or the spider
+    tells that the content is missing (rendered by scripts) with its ``has_content``
+    method. How often the fallback is needed is counted per domain in the stats.
 
-    NOTE: This middleware needs the scrapy to be non-concurrent, because we cannot operate
-    multiple browser tabs concurrently (for humans and Selenium).
+    Browsers load pages lightly: page loads return once the DOM is parsed (the ``eager``
+    ``page-load-strategy``), requests of URLs matching ``blocked-urls`` (fonts, media,
+    trackers) are blocked via CDP, and the page source is taken as soon as the XPath of
+    the content (see the ``selector_of`` method of spiders) is present, or after
+    ``render-timeout`` seconds. Bytes transferred and seconds taken by browsers are
+    counted in stats as ``browser/bytes`` and ``browser/seconds`` over
+    ``browser/pages``; compare them with blocking disabled to see what is saved.
+
+    With ``extract-in-browser``, the XPaths of the spider (see the ``selector_of``
+    method of spiders) are evaluated by the browser in a single script, and only the
+    values are returned, as an :class:`src.util.ExtractedResponse` instead of the page
+    source. Sizes of responses are counted as ``browser/response-bytes``.
+
+    With the ``session`` section of configuration enabled, cookies of browsers are
+    captured after every page (:data:`src.signals.cookies_captured`) and kept by
+    :class:`SessionMiddleware`, and browsers launch with the cookies saved, so passed
+    captchas and sessions survive restarts. With ``profile`` set as well, each browser
+    of the pool keeps a profile of its own in the cache directory instead of running
+    ``--incognito``, reusing cached scripts and stylesheets.
+
+    Captcha hits are reported with the :data:`src.signals.captcha_detected` signal, for
+    :class:`AdaptiveThrottleMiddleware` to slow down. Requests beyond the pool size just
+    wait for idle browsers. No browser is launched when pages are replayed from the page
+    cache.
     """
 
-    driver: Remote
-
-    def __init__(self) -> None:
-        # add arguments and experimental options.
-        options = ChromeOptions()
-        for argument in CONFIG["chrome-driver"]["arguments"]:
-            options.add_argument(argument)
-        for name, value in CONFIG["chrome-driver"]["experimental-options"].items():
-            options.add_experimental_option(name, value)
-
-        # create chrome driver and execute Chrome DevTools Protocol (CDP) command
-        #
-        # which is possibly some magic script to bypass target sites' crawler check.
-        service = ChromeService(executable_path=CONFIG["chrome-driver"]["path"])
-        self.driver = Chrome(options, service)
-        for cmd, args in CONFIG["chrome-driver"]["cdp-command"].items():
-            self.driver.execute_cdp_cmd(cmd, args)
-
-        # implicitly waits for dynamically rendered elements.
-        self.driver.implicitly_wait(5)
-        # maximize window to get the page rendered correctly.
-        self.driver.maximize_window()
-        weakref.finalize(self, lambda d: d.quit(), self.driver)
-
-    def process_request(self, request: Request, spider: Spider) -> Response:
-        self.driver.maximize_window()
-        self.driver.get(request.url)
-        # detect whether the captcha has caught us
-        while "punish" in self.driver.current_url:
-            print("(de-captcha) waiting for manual verification...")
-            time.sleep(5)
-        return HtmlResponse(
-            url=request.url,
-            body=self.driver.page_source,
-            encoding="utf-8",
+    pool: BrowserPool
+    crawler: Crawler
+
+    def __init__(self, crawler: Crawler) -> None:
+        self.pool = BrowserPool(CONFIG["chrome-driver"].get("pool-size", 1), _launch)
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        if crawler.settings.get("PAGE_CACHE_MODE", "off") == "replay":
+            raise NotConfigured
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_closed(self, spider: Spider) -> Deferred:
+        return self.pool.close()
+
+    async def process_request(
+        self,
+        request: Request,
+        spider: Spider,
+    ) -> Response | Request | None:
+        if _is_hybrid() and not request.meta.get("browser", False):
+            return None  # try plain download first.
+
+        selector = None
+        if hasattr(spider, "selector_of"):
+            selector = spider.selector_of(request)
+        extracts = selector is not None and _extracts_in_browser()
+
+        with timed(self.crawler, "browser/acquire"):
+            driver = await self.pool.acquire()
+        discarded = False
+        try:
+            started = time.monotonic()
+            with timed(self.crawler, "browser/navigate"):
+                url = await _in_thread(_navigate, driver, request.url)
+            # detect whether the captcha has caught us
+            if "punish" in url:
+                with timed(self.crawler, "browser/captcha"):
+                    passed = await self._wait_captcha(driver, request, spider)
+                if not passed:
+                    return self._reschedule(request, spider)
+                started = time.monotonic()  # manual verification is not counted.
+            if selector is not None:
+                with timed(self.crawler, "browser/render"):
+                    rendered = await _in_thread(_wait_content, driver, selector.content)
+                if not rendered:
+                    self._inc_stats("browser/render-timeout")
+            if extracts:
+                with timed(self.crawler, "browser/extract"):
+                    spec = selector.extraction_spec()
+                    extraction = await _in_thread(driver.execute_script, _EXTRACT, spec)
+                body = json.dumps(extraction, ensure_ascii=False)
+            else:
+                with timed(self.crawler, "browser/page-source"):
+                    body = await _in_thread(lambda: driver.page_source)
+            transferred = await _in_thread(driver.execute_script, _TRANSFERRED)
+            cookies = None
+            if session_enabled():
+                cookies = await _in_thread(driver.get_cookies)
+        except IgnoreRequest:
+            raise  # given up on the captcha, while the browser is fine.
+        except BaseException:
+            # the browser may have crashed or wedged, or still be busy with a cancelled
+            # call, so it's replaced with a fresh one.
+            discarded = True
+            self.pool.discard(driver)
+            raise
+        finally:
+            if not discarded:
+                self.pool.release(driver)
+        if cookies is not None:
+            self.crawler.signals.send_catch_log(
+                cookies_captured,
+                cookies=cookies,
+                request=request,
+                spider=spider,
+            )
+
+        seconds = time.monotonic() - started
+        self._inc_stats("browser/pages")
+        self.crawler.stats.inc_value("browser/bytes", transferred or 0)
+        self.crawler.stats.inc_value("browser/seconds", round(seconds, 3))
+        # encoded once, for both the size in bytes and the response.
+        encoded = body.encode("utf-8")
+        self.crawler.stats.inc_value("browser/response-bytes", len(encoded))
+        spider.logger.debug(
+            f"(browser) {request.url} rendered in {seconds:.2f}s, {transferred} bytes"
+        )
+        if extracts:
+            return ExtractedResponse(url=request.url, body=encoded, encoding="utf-8")
+        return HtmlResponse(url=request.url, body=encoded, encoding="utf-8")
+
+    def process_response(
+        self,
+        request: Request,
+        response: Response,
+        spider: Spider,
+    ) -> Response | Request:
+        if not _is_hybrid() or request.meta.get("browser", False):
+            return response
+
+        domain = domain_group(request.url)
+        if "punish" in response.url:
+            self._captcha_detected(request, spider)
+        if "punish" in response.url or not _has_content(response, spider):
+            self._inc_stats(f"hybrid/{domain}/fallback")
+            # opened from where it was redirected to the punish page, if it was.
+            url = request.meta.get("redirect_urls", [request.url])[0]
+            meta = {
+                key: value
+                for key, value in request.meta.items()
+                if not key.startswith("redirect_")
+            }
+            meta["browser"] = True
+            return request.replace(url=url, meta=meta, dont_filter=True)
+        self._inc_stats(f"hybrid/{domain}/plain")
+        return response
+
+    async def _wait_captcha(
+        self,
+        driver: "Remote",
+        request: Request,
+        spider: Spider,
+    ) -> bool:
+        """Waits for manual verification. Returns whether the captcha is passed."""
+        from twisted.internet import reactor
+
+        timeout = CONFIG["chrome-driver"].get("captcha-timeout", 300)
+        interval = CONFIG["chrome-driver"].get("captcha-poll-interval", 5)
+        self._captcha_detected(request, spider)
+
+        deadline = time.monotonic() + timeout
+        spider.logger.warning("(de-captcha) waiting for manual verification...")
+        while time.monotonic() < deadline:
+            await maybe_deferred_to_future(task.deferLater(reactor, interval))
+            if "punish" not in await _in_thread(lambda: driver.current_url):
+                return True
+        self._inc_stats("captcha/timeout")
+        return False
+
+    def _reschedule(self, request: Request, spider: Spider) -> Request:
+        """
+        Sends a request whose captcha timed out back to the scheduler, or gives it up
+        after ``captcha-attempts`` timeouts.
+        """
+        attempts = request.meta.get("captcha_attempts", 0) + 1
+        if attempts >= CONFIG["chrome-driver"].get("captcha-attempts", 3):
+            spider.logger.warning(
+                f"(de-captcha) timed out {attempts} times, giving up {request.url}"
+            )
+            self._inc_stats("captcha/gave-up")
+            raise IgnoreRequest(f"captcha of {request.url} is not passed")
+        spider.logger.warning("(de-captcha) timed out, rescheduling the request")
+        meta = {**request.meta, "captcha_attempts": attempts}
+        return request.replace(meta=meta, dont_filter=True)
+
+    def _captcha_detected(self, request: Request, spider: Spider) -> None:
+        self._inc_stats("captcha/count")
+        self.crawler.signals.send_catch_log(
+            captcha_detected,
+            request=request,
+            spider=spider,
         )
+
+    def _inc_stats(self, key: str) -> None:
+        self.crawler.stats.inc_value(key)
+
+
+def _launch(slot: int) -> "Remote":
+    from selenium.webdriver import Chrome, ChromeOptions, ChromeService
+
+    # add arguments and experimental options.
+    options = ChromeOptions()
+    profile = _profile_dir(slot)
+    for argument in CONFIG["chrome-driver"]["arguments"]:
+        if profile is not None and argument == "--incognito":
+            continue  # incognito windows keep nothing in the profile.
+        options.add_argument(argument)
+    if profile is not None:
+        profile.mkdir(parents=True, exist_ok=True)
+        options.add_argument(f"--user-data-dir={profile}")
+    if CONFIG["chrome-driver"].get("headless", False):
+        options.add_argument("--headless=new")
+    # one user-agent for the whole session of the browser, as a real one keeps. A
+    # persistent profile keeps the same one across restarts.
+    agents = user_agents("chrome")
+    if agents:
+        choice = random.choice if profile is None else random.Random(slot).choice
+        options.add_argument(f"--user-agent={choice(agents)}")
+    for name, value in CONFIG["chrome-driver"]["experimental-options"].items():
+        options.add_experimental_option(name, value)
+    # "eager" returns from page loads once the DOM is parsed, without waiting for
+    # images, stylesheets and frames; the content is waited for explicitly.
+    strategy = CONFIG["chrome-driver"].get("page-load-strategy", "eager")
+    options.page_load_strategy = strategy
+
+    # create chrome driver and execute Chrome DevTools Protocol (CDP) command
+    #
+    # which is possibly some magic script to bypass target sites' crawler check.
+    service = ChromeService(executable_path=CONFIG["chrome-driver"]["path"])
+    driver = Chrome(options, service)
+    for cmd, args in CONFIG["chrome-driver"]["cdp-command"].items():
+        driver.execute_cdp_cmd(cmd, args)
+    # requests of blocked URLs fail at once, without reaching the network.
+    blocked = CONFIG["chrome-driver"].get("blocked-urls", [])
+    if blocked:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
+    # restore the session saved, e.g. with the cookies of passed captchas.
+    if session_enabled():
+        cookies = [_cdp_cookie(cookie) for cookie in open_cookie_store().cookies()]
+        if cookies:
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+
+    # a page load that never finishes raises, and the driver will be recycled.
+    driver.set_page_load_timeout(CONFIG["chrome-driver"].get("page-load-timeout", 60))
+    # maximize window to get the page rendered correctly.
+    driver.maximize_window()
+    return driver
+
+
+def _profile_dir(slot: int) -> pathlib.Path | None:
+    # every browser of the pool has a profile of its own, as Chrome locks profiles.
+    profile = CONFIG.get("session", {}).get("profile", "")
+    if not session_enabled() or not profile:
+        return None
+    return CACHE_DIR / profile / str(slot)
+
+
+def _cdp_cookie(cookie: dict) -> dict:
+    # the format of WebDriver to that of `Network.setCookies`.
+    result = {key: value for key, value in cookie.items() if key != "expiry"}
+    if cookie.get("expiry") is not None:
+        result["expires"] = cookie["expiry"]
+    return result
+
+
+def _extracts_in_browser() -> bool:
+    return CONFIG["chrome-driver"].get("extract-in-browser", False)
+
+
+def _is_hybrid() -> bool:
+    return CONFIG["chrome-driver"].get("fetch-mode", "browser") == "hybrid"
+
+
+def _has_content(response: Response, spider: Spider) -> bool:
+    if not isinstance(response, TextResponse):
+        return False
+    if not hasattr(spider, "has_content"):
+        return True
+    return spider.has_content(response)
+
+
+def _navigate(driver: "Remote", url: str) -> str:
+    driver.get(url)
+    return driver.current_url
+
+
+def _wait_content(driver: "Remote", xpath: str) -> bool:
+    """Waits for the XPath to match in the page. Returns whether it matched in time."""
+    from selenium.webdriver.support.wait import WebDriverWait
+
+    timeout = CONFIG["chrome-driver"].get("render-timeout", 10)
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            lambda driver: driver.execute_script(_MATCHES, xpath)
+        )
+    except TimeoutException:
+        return False
+    return True
+
+
+async def _in_thread[T](function: Callable[..., T], *args) -> T:
+    # Selenium calls are blocking, so they are kept out of the reactor thread.
+    return await maybe_deferred_to_future(threads.deferToThread(function, *args))
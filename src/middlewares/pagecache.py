@@ -0,0 +1,154 @@
+import time
+from typing import Iterable, Self
+
+from scrapy import Request, Spider, signals
+from scrapy.crawler import Crawler
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import HtmlResponse, Response, TextResponse
+from scrapy.utils.request import request_from_dict
+
+from ..frontier import FRONTIER_ID
+from ..storage import CachedPage, PageCache, open_page_cache
+from ..util import ExtractedResponse
+
+__all__ = ["PageCacheMiddleware", "ReplayMiddleware"]
+
+# meta of the download or scheduling of a request, not to be replayed.
+_VOLATILE_META = {
+    "download_slot",
+    "download_latency",
+    "retry_times",
+    "captcha_attempts",
+    "depth",
+    "browser",
+    "cached_at",
+    FRONTIER_ID,
+}
+
+
+class PageCacheMiddleware(object):
+    """
+    Saves raw pages to the page cache (see :class:`src.storage.PageCache`), or serves
+    pages from it without network, by the ``PAGE_CACHE_MODE`` setting:
+
+    - ``record``: pages are saved, whether downloaded by browsers or not. Only complete
+      pages (with content matched by the XPaths of the spider) are saved, so captcha
+      pages and failed renderings are never replayed. Values extracted by browsers are
+      not pages, and are not saved.
+    - ``replay``: pages are served from the cache, and requests of pages not cached are
+      ignored. Along with :class:`ReplayMiddleware`, spiders parse the cached pages
+      again, e.g. after changing XPaths or fields of items. The time pages were cached
+      is in ``cached_at`` of the meta.
+    """
+
+    crawler: Crawler
+    mode: str
+    cache: PageCache
+
+    def __init__(self, crawler: Crawler, mode: str) -> None:
+        self.crawler = crawler
+        self.mode = mode
+        self.cache = open_page_cache()
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        mode = crawler.settings.get("PAGE_CACHE_MODE", "off")
+        if mode not in ("record", "replay"):
+            raise NotConfigured
+        middleware = cls(crawler, mode)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def process_request(self, request: Request, spider: Spider) -> Response | None:
+        if self.mode != "replay":
+            return None
+        page = self.cache.get(self._fingerprint(request))
+        if page is None:
+            self.crawler.stats.inc_value("pagecache/miss")
+            raise IgnoreRequest(f"{request.url} is not cached")
+        self.crawler.stats.inc_value("pagecache/hit")
+        # items parsed from the page were fetched when the page was cached.
+        request.meta["cached_at"] = page.cached_at
+        return HtmlResponse(
+            url=page.url,
+            status=page.status,
+            headers=page.headers,
+            body=page.body,
+            encoding=page.encoding,
+            request=request,
+            flags=["cached"],
+        )
+
+    def process_response(
+        self,
+        request: Request,
+        response: Response,
+        spider: Spider,
+    ) -> Response:
+        if self.mode != "record" or "cached" in response.flags:
+            return response
+        if response.status != 200 or not isinstance(response, TextResponse):
+            return response
+        if isinstance(response, ExtractedResponse):
+            return response  # not the page, but values extracted from it.
+        if "punish" in response.url:
+            return response
+        if hasattr(spider, "has_content") and not spider.has_content(response):
+            return response
+
+        payload = request.to_dict(spider=spider)
+        payload["meta"] = {
+            key: value
+            for key, value in payload["meta"].items()
+            if key not in _VOLATILE_META
+        }
+        page = CachedPage(
+            url=response.url,
+            status=response.status,
+            headers={key: list(values) for key, values in response.headers.items()},
+            encoding=response.encoding,
+            body=response.body,
+            request=payload,
+            cached_at=time.time(),
+        )
+        written = self.cache.put(self._fingerprint(request), spider.name, page)
+        self.crawler.stats.inc_value("pagecache/stored")
+        self.crawler.stats.inc_value("pagecache/bytes", written)
+        return response
+
+    def spider_closed(self, spider: Spider) -> None:
+        self.cache.close()
+
+    def _fingerprint(self, request: Request) -> str:
+        return self.crawler.request_fingerprinter.fingerprint(request).hex()
+
+
+class ReplayMiddleware(object):
+    """
+    Spider middleware replacing the start requests of spiders with the requests of all
+    pages cached by the same spider, when ``PAGE_CACHE_MODE`` is ``replay``.
+
+    Spiders with a ``partition`` (see :class:`src.util.Partition`) replay their shard of
+    the pages, by request fingerprints.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        if crawler.settings.get("PAGE_CACHE_MODE", "off") != "replay":
+            raise NotConfigured
+        return cls()
+
+    def process_start_requests(
+        self,
+        start_requests: Iterable[Request],
+        spider: Spider,
+    ) -> Iterable[Request]:
+        cache = open_page_cache()
+        try:
+            for fingerprint, request in cache.requests(spider.name):
+                partition = getattr(spider, "partition", None)
+                if partition is not None and not partition.owns(fingerprint):
+                    continue
+                yield request_from_dict(request, spider=spider)
+        finally:
+            cache.close()
@@ -0,0 +1,91 @@
+from typing import Self
+
+from scrapy import Request, Spider, signals
+from scrapy.crawler import Crawler
+from scrapy.exceptions import NotConfigured
+
+from ..conf import CONFIG
+from ..signals import cookies_captured
+from ..storage import CookieStore, open_cookie_store
+
+__all__ = ["SessionMiddleware"]
+
+
+class SessionMiddleware(object):
+    """
+    Keeps the sessions of browsers across restarts, and shares them with requests
+    downloaded without browsers.
+
+    Cookies captured from browsers (:data:`src.signals.cookies_captured`), including
+    those of passed captchas, are saved to the cookie store (see
+    :class:`src.storage.CookieStore`), from which browsers are restored on launch. Plain
+    requests (e.g. in the ``hybrid`` fetch mode) carry the cookies of their URLs, so a
+    verified session serves many requests without opening browsers. It's placed before
+    the ``CookiesMiddleware`` of Scrapy, which sends them along with cookies of its own
+    jar.
+
+    Enabled with ``enabled = true`` in the ``session`` section of configuration. Cookies
+    sent with plain requests are counted in stats as ``session/cookies``.
+    """
+
+    crawler: Crawler
+    store: CookieStore
+
+    def __init__(self, crawler: Crawler, store: CookieStore) -> None:
+        self.crawler = crawler
+        self.store = store
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        if not session_enabled():
+            raise NotConfigured
+        middleware = cls(crawler, open_cookie_store())
+        crawler.signals.connect(middleware.cookies_captured, signal=cookies_captured)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def process_request(self, request: Request, spider: Spider) -> None:
+        cookies = self.store.cookies(request.url)
+        if not cookies:
+            return
+        session = [_scrapy_cookie(cookie) for cookie in cookies]
+        own = request.cookies
+        if isinstance(own, dict):
+            own = [{"name": name, "value": value} for name, value in own.items()]
+        # retried requests carry the cookies of the session added before.
+        keys = {_key(cookie) for cookie in session}
+        own = [cookie for cookie in own if _key(cookie) not in keys]
+        # cookies of the request itself win over those of the session.
+        request.cookies = [*session, *own]
+        self.crawler.stats.inc_value("session/cookies", len(cookies))
+
+    def cookies_captured(
+        self,
+        cookies: list[dict],
+        request: Request,
+        spider: Spider,
+    ) -> None:
+        self.store.update(cookies)
+        self.store.save()
+
+    def spider_closed(self, spider: Spider) -> None:
+        self.store.save()
+
+
+def session_enabled() -> bool:
+    return CONFIG.get("session", {}).get("enabled", False)
+
+
+def _key(cookie: dict) -> tuple:
+    return (cookie.get("domain"), cookie.get("path", "/"), cookie.get("name"))
+
+
+def _scrapy_cookie(cookie: dict) -> dict:
+    # the format of `Request.cookies`, taken by the `CookiesMiddleware` of Scrapy.
+    return {
+        "name": cookie["name"],
+        "value": cookie["value"],
+        "domain": cookie["domain"],
+        "path": cookie.get("path", "/"),
+        "secure": cookie.get("secure", False),
+    }
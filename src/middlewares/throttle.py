@@ -0,0 +1,200 @@
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Self
+
+from scrapy import Request, Spider
+from scrapy.crawler import Crawler
+from scrapy.downloadermiddlewares.retry import RetryMiddleware
+from scrapy.http import Response
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet import task
+
+from ..conf import CONFIG
+from ..signals import captcha_detected
+from ..util import domain_group
+
+__all__ = ["AdaptiveThrottleMiddleware", "BackoffRetryMiddleware"]
+
+
+@dataclass
+class _DomainState(object):
+    delay: float
+    next_time: float = 0.0
+    clean_streak: int = 0
+
+
+@dataclass
+class _Window(object):
+    """Outcomes of the latest responses, for estimating the rates."""
+
+    size: int
+    outcomes: deque[tuple[float, bool]] = field(default_factory=deque)
+
+    def push(self, captcha: bool) -> None:
+        self.outcomes.append((time.monotonic(), captcha))
+        while len(self.outcomes) > self.size:
+            self.outcomes.popleft()
+
+    def captcha_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(captcha for _, captcha in self.outcomes) / len(self.outcomes)
+
+    def per_minute(self) -> float:
+        if len(self.outcomes) < 2:
+            return 0.0
+        elapsed = self.outcomes[-1][0] - self.outcomes[0][0]
+        return 60 * (len(self.outcomes) - 1) / elapsed if elapsed > 0 else 0.0
+
+
+class AdaptiveThrottleMiddleware(object):
+    """
+    Paces requests by the feedback of the target site, replacing the fixed
+    ``DOWNLOAD_DELAY``.
+
+    Each domain group (see :func:`src.util.domain_group`) has its own delay between
+    requests. While responses are clean, the delay shrinks by ``recovery`` and the
+    concurrency widens by one every ``widen-after`` responses, up to
+    ``CONCURRENT_REQUESTS``; whenever the captcha is detected
+    (:data:`src.signals.captcha_detected`), the delay is multiplied by ``backoff`` and
+    the concurrency is halved. The concurrency is applied to the downloader as a whole,
+    because requests served by browsers never reach the downloader slots.
+
+    Current delays, concurrency, rate (responses per minute) and captcha rate are
+    exposed in stats under ``throttle/``.
+    """
+
+    crawler: Crawler
+    options: dict
+    concurrency: int
+    _domains: dict[str, _DomainState]
+    _window: _Window
+
+    def __init__(self, crawler: Crawler) -> None:
+        self.crawler = crawler
+        self.options = CONFIG.get("throttle", {})
+        self.concurrency = 1
+        self._domains = {}
+        self._window = _Window(self.options.get("window", 100))
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.captcha_detected, signal=captcha_detected)
+        return middleware
+
+    async def process_request(self, request: Request, spider: Spider) -> None:
+        from twisted.internet import reactor
+
+        self._apply_concurrency()
+        state = self._state(request.url)
+
+        # reserve the next time slot of the domain, randomized like Scrapy does.
+        now = time.monotonic()
+        start = max(now, state.next_time)
+        state.next_time = start + state.delay * random.uniform(0.5, 1.5)
+        if start > now:
+            await maybe_deferred_to_future(task.deferLater(reactor, start - now))
+
+    def process_response(
+        self,
+        request: Request,
+        response: Response,
+        spider: Spider,
+    ) -> Response:
+        if "punish" in response.url:
+            return response  # reported by the captcha_detected signal.
+
+        state = self._state(request.url)
+        state.delay = max(
+            self.options.get("min-delay", 0.5),
+            state.delay * self.options.get("recovery", 0.9),
+        )
+        state.clean_streak += 1
+        if state.clean_streak >= self.options.get("widen-after", 10):
+            state.clean_streak = 0
+            self.concurrency = min(
+                self.concurrency + 1,
+                self.crawler.settings.getint("CONCURRENT_REQUESTS"),
+            )
+        self._window.push(False)
+        self._update_stats()
+        return response
+
+    def captcha_detected(self, request: Request, spider: Spider) -> None:
+        state = self._state(request.url)
+        state.delay = min(
+            self.options.get("max-delay", 120.0),
+            max(state.delay, self.options.get("start-delay", 3.0))
+            * self.options.get("backoff", 2.0),
+        )
+        state.clean_streak = 0
+        self.concurrency = max(1, self.concurrency // 2)
+        self._window.push(True)
+        self._update_stats()
+
+    def _state(self, url: str) -> _DomainState:
+        domain = domain_group(url)
+        if domain not in self._domains.keys():
+            self._domains[domain] = _DomainState(self.options.get("start-delay", 3.0))
+        return self._domains[domain]
+
+    def _apply_concurrency(self) -> None:
+        if self.crawler.engine is not None:
+            self.crawler.engine.downloader.total_concurrency = self.concurrency
+
+    def _update_stats(self) -> None:
+        stats = self.crawler.stats
+        stats.set_value("throttle/concurrency", self.concurrency)
+        stats.set_value("throttle/rate", round(self._window.per_minute(), 2))
+        stats.set_value("throttle/captcha_rate", round(self._window.captcha_rate(), 4))
+        for domain, state in self._domains.items():
+            stats.set_value(f"throttle/{domain}/delay", round(state.delay, 3))
+
+
+class BackoffRetryMiddleware(RetryMiddleware):
+    """
+    Retries transient failures like :class:`RetryMiddleware`, but waits an exponential,
+    jittered backoff before handing the retry request back to the engine.
+
+    The n-th retry waits ``base-delay * 2 ** (n - 1)`` seconds at most ``max-delay``,
+    multiplied by a random factor in ``[0.5, 1.5)``; the options are in the ``retry``
+    section of configuration.
+    """
+
+    async def process_response(
+        self,
+        request: Request,
+        response: Response,
+        spider: Spider,
+    ) -> Request | Response:
+        result = super().process_response(request, response, spider)
+        if isinstance(result, Request):
+            await _backoff(result)
+        return result
+
+    async def process_exception(
+        self,
+        request: Request,
+        exception: Exception,
+        spider: Spider,
+    ) -> Request | Response | None:
+        result = super().process_exception(request, exception, spider)
+        if isinstance(result, Request):
+            await _backoff(result)
+        return result
+
+
+async def _backoff(request: Request) -> None:
+    from twisted.internet import reactor
+
+    options: dict = CONFIG.get("retry", {})
+    retries = request.meta.get("retry_times", 1)
+    delay = min(
+        options.get("max-delay", 60.0),
+        options.get("base-delay", 2.0) * 2 ** (retries - 1),
+    )
+    delay *= random.uniform(0.5, 1.5)
+    await maybe_deferred_to_future(task.deferLater(reactor, delay))
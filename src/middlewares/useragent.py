@@ -1,9 +1,25 @@
-from typing import ClassVar
+import json
+import os
+import random
+from functools import cache
+from importlib.metadata import version
 
-from fake_useragent import UserAgent
 from scrapy import Request, Spider
 
-__all__ = ["RandomUserAgentMiddleware"]
+from ..conf import CACHE_DIR
+
+__all__ = ["RandomUserAgentMiddleware", "user_agents"]
+
+# browsers of :module:`fake-useragent` to pool, and how many user-agents are drawn from
+# each, weighted by their shares.
+_BROWSERS = ["chrome", "edge", "firefox", "safari"]
+_DRAWS = 200
+
+# the user-agent of the Chrome driver configured, when there's no other.
+_FALLBACK = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36"
+)
 
 
 class RandomUserAgentMiddleware(object):
@@ -12,9 +28,68 @@ class RandomUserAgentMiddleware(object):
 
     Currently, we limit the platform of user-agents to PC, in case the target sites return
     different page sources.
+
+    A user-agent is picked at random for each request. Requests of a session (cookie
+    jar, see the ``cookiejar`` meta of Scrapy) keep the user-agent picked for its first
+    one, as a browser would. Browsers opened by :class:`InteractiveMiddleware` pick
+    their own on launch.
     """
 
-    ua: ClassVar[UserAgent] = UserAgent(platforms="pc")
+    sessions: dict[object, str]
+
+    def __init__(self) -> None:
+        self.sessions = {}
 
     def process_request(self, request: Request, spider: Spider) -> None:
-        request.headers["User-Agent"] = __class__.ua.random
+        if "cookiejar" not in request.meta:
+            request.headers["User-Agent"] = random.choice(user_agents())
+            return
+        session = request.meta["cookiejar"]
+        if session not in self.sessions.keys():
+            self.sessions[session] = random.choice(user_agents())
+        request.headers["User-Agent"] = self.sessions[session]
+
+
+@cache
+def user_agents(browser: str | None = None) -> list[str]:
+    """
+    PC user-agents of :module:`fake-useragent`, of the ``browser`` (e.g. ``chrome``)
+    if specified. Never empty: a user-agent of Chrome is returned if nothing is found.
+
+    The pool is saved in the cache directory, so :module:`fake-useragent` is loaded
+    only when it's upgraded. Call it whenever and wherever you want.
+    """
+    path = CACHE_DIR / "useragents.json"
+    current = version("fake-useragent")
+    pool = None
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            pool = json.load(f)
+    if pool is None or pool["version"] != current or not pool["agents"]:
+        pool = {"version": current, "agents": _draw_user_agents()}
+        if pool["agents"]:
+            # written aside and renamed, as crawler processes may start at once.
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump(pool, f)
+            os.replace(temp, path)
+    agents = [
+        agent
+        for agent, family in pool["agents"]
+        if browser is None or family == browser
+    ]
+    return agents or [_FALLBACK]
+
+
+def _draw_user_agents() -> list[list[str]]:
+    # only the public API of :module:`fake-useragent` is used, whose data files change
+    # their layout across versions. It returns the fallback when nothing matches.
+    from fake_useragent import UserAgent
+
+    agents = []
+    for browser in _BROWSERS:
+        source = UserAgent(browsers=[browser], platforms="pc", fallback="")
+        drawn = {source.random for _ in range(_DRAWS)}
+        agents.extend([agent, browser] for agent in sorted(drawn) if agent)
+    return agents
@@ -1,2 +1,3 @@
 from .catalog import *  # noqa: F403
 from .detail import *  # noqa: F403
+from .frontier import *  # noqa: F403
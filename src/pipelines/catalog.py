@@ -1,35 +1,24 @@
-import pathlib
-import pickle
-import weakref
-
 from scrapy import Item, Spider
 
-from ..conf import CACHE_DIR
+from ..extensions import timed
 from ..items import Catalog, CatalogItem
-from ..util import AdministrativeArea
+from ..storage import ItemStore, open_store
 
 __all__ = ["CatalogItemPipeline"]
 
 
 class CatalogItemPipeline(object):
-    cache_path = CACHE_DIR / "catalogs.pickle"
-    items: dict[AdministrativeArea, list[Catalog]] = {}
-    _finalizer: weakref.finalize
+    store: ItemStore[Catalog]
 
     def open_spider(self, spider: Spider) -> None:
-        def finalizer(data: dict, path: pathlib.Path) -> None:
-            with open(path, "wb") as file:
-                pickle.dump(data, file=file)
-
-        self._finalizer = weakref.finalize(self, finalizer, self.items, self.cache_path)
+        self.store = open_store("catalogs", spider.partition.name)
 
     def close_spider(self, spider: Spider) -> None:
-        self._finalizer()
+        self.store.close()
 
     def process_item(self, item: Item, spider: Spider) -> Item:
         if not isinstance(item, CatalogItem):
             return item
-        if item["area"] not in self.items.keys():
-            self.items[item["area"]] = []
-        self.items[item["area"]].append(item["catalog"])
+        with timed(spider.crawler, "pipeline/catalog"):
+            self.store.append(item["area"], item["catalog"])
         return item
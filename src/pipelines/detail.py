@@ -1,44 +1,54 @@
-import pathlib
-import pickle
-import weakref
+import time
 
 from scrapy import Item, Spider
 
-from ..conf import CACHE_DIR
-from ..items import Detail, DetailItem
+from ..extensions import timed
+from ..items import CatalogKey, Detail, DetailItem
+from ..storage import ItemStore, open_store
 from ..util import AdministrativeArea
 
 __all__ = ["DetailItemPipeline"]
 
 
 class DetailItemPipeline(object):
-    cache_path = CACHE_DIR / "details.pickle"
-    items: dict[AdministrativeArea, list[Detail]] = {}
-    _finalizer: weakref.finalize
+    store: ItemStore[Detail]
+    index: dict[AdministrativeArea, dict[CatalogKey, float | None]]
+    started_at: float
 
     def open_spider(self, spider: Spider) -> None:
-        # if the cache already exists, load them.
-        if self.cache_path.exists():
-            with open(self.cache_path, "rb") as f:
-                self.items = pickle.load(f)
+        self.store = open_store("details", spider.partition.name)
+        self.started_at = time.time()
 
-        # defines the finalizer to be called when the program exits, normally or not.
-        #
-        # just simply saves the file using pickle.
-        def finalizer(data: dict, path: pathlib.Path) -> None:
-            with open(path, "wb") as file:
-                pickle.dump(data, file=file)
-
-        self._finalizer = weakref.finalize(self, finalizer, self.items, self.cache_path)
+        # index the keys of crawled records with the time they were fetched, in order
+        # to tell duplicates in O(1).
+        self.index = {}
+        for area, detail in self.store:
+            if area not in self.index.keys():
+                self.index[area] = {}
+            self.index[area][detail.key] = detail.fetched_at
 
     def close_spider(self, spider: Spider) -> None:
-        self._finalizer()
+        self.store.close()
 
     def process_item(self, item: Item, spider: Spider) -> Item:
         if not isinstance(item, DetailItem):
             return item
-        if item["area"] not in self.items.keys():
-            self.items[item["area"]] = []
-        self.items[item["area"]].append(item["detail"])
-        print(f"Processed item {item["detail"].detail_url}")
+        if item["area"] not in self.index.keys():
+            self.index[item["area"]] = {}
+        index = self.index[item["area"]]
+        detail: Detail = item["detail"]
+
+        # the same supplier may be requested more than once (e.g. retried requests).
+        # Records fetched before this crawl are replaced by refreshed ones.
+        if detail.key in index.keys():
+            fetched_at = index[detail.key]
+            if fetched_at is not None and fetched_at >= self.started_at:
+                return item
+            if detail.fetched_at is None:
+                return item
+        with timed(spider.crawler, "pipeline/detail"):
+            self.store.append(item["area"], detail)
+        index[detail.key] = detail.fetched_at
+        spider.crawler.stats.inc_value("pipeline/detail/stored")
+        spider.logger.debug(f"Stored the detail of {detail.detail_url}")
         return item
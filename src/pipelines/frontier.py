@@ -0,0 +1,100 @@
+from typing import Any, Self
+
+from scrapy import Item, Spider
+from scrapy.crawler import Crawler
+
+from ..frontier import SqliteFrontier, open_frontier
+from ..items import CatalogItem, CatalogKey, Detail
+from ..spiders.detail import (
+    DetailSpider,
+    PendingCatalog,
+    crawled_details,
+    incremental_freshness,
+)
+from ..util import AdministrativeArea, FreshnessPolicy
+
+__all__ = ["FrontierFeedPipeline"]
+
+
+class FrontierFeedPipeline(object):
+    """
+    Feeds the detail request of every crawled catalog to the queue of
+    :class:`DetailSpider` in the shared frontier, so that detail crawlers work along
+    with catalog crawlers instead of waiting for the catalogs store to be complete.
+
+    As :class:`DetailSpider` does, suppliers are requested once for all the areas they
+    are found in: catalogs of a supplier whose request is still queued are added to its
+    ``duplicates``, counted as ``dedup/saved``. Catalogs whose details are crawled
+    already (and not stale, see the ``incremental`` section of configuration) are
+    skipped, counted as ``frontier/skipped``.
+    """
+
+    crawler: Crawler
+    frontier: SqliteFrontier
+    details: dict[tuple[AdministrativeArea, CatalogKey], Detail]
+    freshness: FreshnessPolicy | None
+
+    def __init__(self, crawler: Crawler) -> None:
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> Self:
+        return cls(crawler)
+
+    def open_spider(self, spider: Spider) -> None:
+        self.frontier = open_frontier()
+        self.details = crawled_details(spider.partition)
+        self.freshness = incremental_freshness()
+
+    def close_spider(self, spider: Spider) -> None:
+        self.frontier.close()
+
+    def process_item(self, item: Item, spider: Spider) -> Item:
+        if not isinstance(item, CatalogItem):
+            return item
+        area, catalog = item["area"], item["catalog"]
+        stats = self.crawler.stats
+
+        previous = self.details.get((area, catalog.key))
+        if previous is not None and not self._is_stale(previous):
+            stats.inc_value("frontier/skipped")
+            return item
+        pending = (area, catalog, previous)
+
+        # the supplier is queued for another area, and gets the detail of this one too.
+        if self.frontier.extend(
+            DetailSpider.name,
+            catalog.supplier,
+            lambda request: _with_duplicate(request, pending),
+        ):
+            stats.inc_value("dedup/saved")
+            return item
+
+        request = DetailSpider.request_of(area, catalog, previous)
+        # recorded for detail crawlers reading the catalogs store not to request it.
+        fingerprint = self.crawler.request_fingerprinter.fingerprint(request)
+        self.frontier.seen(fingerprint.hex())
+        self.frontier.push(
+            DetailSpider.name,
+            request.to_dict(),
+            request.priority,
+            catalog.supplier,
+        )
+        stats.inc_value("frontier/fed")
+        return item
+
+    def _is_stale(self, detail: Detail) -> bool:
+        if self.freshness is None:
+            return False
+        return self.freshness.is_stale(detail.fetched_at, detail.changes)
+
+
+def _with_duplicate(request: dict[str, Any], pending: PendingCatalog) -> dict[str, Any]:
+    meta = request["meta"]
+    area, catalog, _ = pending
+    targets = [(meta["area"], meta["catalog"]), *meta.get("duplicates", [])]
+    # the same catalog may be crawled again, e.g. by a catalog crawler restarted.
+    if any(a == area and c.key == catalog.key for a, c, *_ in targets):
+        return request
+    meta["duplicates"] = [*meta.get("duplicates", []), pending]
+    return request
@@ -7,6 +7,10 @@
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+from scrapy.settings import default_settings
+
+from . import conf
+
 BOT_NAME = "alibaba-crawlerplus-v2"
 
 SPIDER_MODULES = ["src.spiders"]
@@ -16,14 +20,40 @@ NEWSPIDER_MODULE = "src.spiders"
 # Never obey robots.txt rules
 ROBOTSTXT_OBEY = False
 
-CONCURRENT_REQUESTS = 1
+# the upper bound of concurrency, at least the number of browsers for all of them to be
+# used. The actual concurrency and delays between requests are adjusted by
+# AdaptiveThrottleMiddleware during the crawl.
+CONCURRENT_REQUESTS = max(
+    conf.CONFIG.get("throttle", {}).get("max-concurrency", 1),
+    conf.CONFIG.get("chrome-driver", {}).get("pool-size", 1),
+)
 CONCURRENT_ITEMS = 1
-RETRY_ENABLED = False
-DOWNLOAD_DELAY = 3
+DOWNLOAD_DELAY = 0
+
+# transient failures are retried with jittered backoff by BackoffRetryMiddleware.
+RETRY_ENABLED = True
+RETRY_TIMES = conf.CONFIG.get("retry", {}).get("times", 3)
+RETRY_EXCEPTIONS = [
+    *default_settings.RETRY_EXCEPTIONS,
+    "selenium.common.WebDriverException",
+]
+
+# pages are saved to (`record`), or served from (`replay`), the page cache.
+PAGE_CACHE_MODE = conf.CONFIG.get("page-cache", {}).get("mode", "off")
 
 DOWNLOADER_MIDDLEWARES = {
+    "src.middlewares.PageCacheMiddleware": 540,
     "src.middlewares.RandomUserAgentMiddleware": 543,
+    "src.middlewares.AdaptiveThrottleMiddleware": 545,
+    "scrapy.downloadermiddlewares.retry.RetryMiddleware": None,
+    "src.middlewares.BackoffRetryMiddleware": 550,
     "src.middlewares.InteractiveMiddleware": 553,
+    # before the CookiesMiddleware of Scrapy (700), which sends the cookies it adds.
+    "src.middlewares.SessionMiddleware": 690,
+}
+
+SPIDER_MIDDLEWARES = {
+    "src.middlewares.ReplayMiddleware": 50,
 }
 
 ITEM_PIPELINES = {
@@ -31,6 +61,18 @@ ITEM_PIPELINES = {
     "src.pipelines.DetailItemPipeline": 300,
 }
 
+EXTENSIONS = {
+    "src.extensions.TelemetryExtension": 500,
+}
+
+# requests are scheduled and de-duplicated through the frontier shared by crawlers, and
+# catalogs are fed to detail crawlers as they're crawled.
+if conf.CONFIG.get("frontier", {}).get("enabled", False):
+    SCHEDULER = "src.frontier.SharedScheduler"
+    DUPEFILTER_CLASS = "src.frontier.SharedDupeFilter"
+    SPIDER_MIDDLEWARES["src.middlewares.FrontierMiddleware"] = 100
+    ITEM_PIPELINES["src.pipelines.FrontierFeedPipeline"] = 400
+
 # Set settings whose default value is deprecated to a future-proof value
 REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
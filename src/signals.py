@@ -0,0 +1,17 @@
+"""
+Custom signals of the project, sent through the crawler's signal manager like the
+built-in ones of :mod:`scrapy.signals`.
+"""
+
+# sent with arguments ``request`` and ``spider`` whenever a request is caught by the
+# captcha (redirected to the punish page).
+captcha_detected = object()
+
+# sent with arguments ``stage`` and ``seconds`` whenever a stage of processing (e.g.
+# browser navigation, XPath evaluation) is timed, see :func:`src.extensions.timed`.
+stage_timed = object()
+
+# sent with arguments ``cookies`` (in the format of WebDriver), ``request`` and
+# ``spider`` whenever a page is opened in a browser and the session is kept (see the
+# ``session`` section of configuration).
+cookies_captured = object()
@@ -1,22 +1,83 @@
-from typing import Iterable, override
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, override
 
 from scrapy import Request, Spider
 from scrapy.http import Response
+from twisted.python.failure import Failure
 
 from ..conf import CONFIG
+from ..extensions import timed
+from ..frontier import frontier_worker
 from ..items import Catalog, CatalogItem
-from ..util import AdministrativeArea, administrative_nodes, alibaba_search_url
+from ..util import (
+    AdministrativeArea,
+    CatalogSelector,
+    Partition,
+    administrative_nodes,
+    alibaba_search_url,
+    document_of,
+)
 
 __all__ = ["CatalogSpider"]
 
 
+@dataclass
+class _AreaProgress(object):
+    """Pages of an area requested but not parsed yet, for the latency stats."""
+
+    mode: str
+    started: float
+    pending: int = 1
+    pages: int = 0
+
+
 class CatalogSpider(Spider):
     """
     Crawls the search results of all nodes of administrative area trees.
+
+    Spider arguments ``shard`` and ``areas`` select a partition of the nodes to search
+    (see :class:`Partition`), e.g. ``-a shard=0/4`` in the first of four processes.
+
+    In the ``parallel`` pagination mode, all pages of an area are requested as soon as
+    the first page tells the page count; otherwise (or when the count is missing) the
+    next page link is followed. Seconds to crawl all pages of each area are recorded in
+    stats by mode.
     """
 
     name = "catalog"
     allowed_domains = ["alibaba.com"]
+    selector: CatalogSelector
+    partition: Partition
+    parallel: bool
+    _progress: dict[AdministrativeArea, _AreaProgress]
+
+    def __init__(
+        self,
+        *args: Any,
+        shard: str | None = None,
+        areas: str | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.selector = CatalogSelector(CONFIG["xpath"]["catalog"])
+        self.partition = Partition.parse(shard, areas, frontier_worker())
+        mode = CONFIG.get("pagination", {}).get("mode", "parallel")
+        assert mode in ("parallel", "serial"), f"unknown pagination mode {mode!r}"
+        self.parallel = mode == "parallel"
+        self._progress = {}
+
+    def has_content(self, response: Response) -> bool:
+        """Whether the page is completely rendered."""
+        return self.selector.has_content(document_of(response))
+
+    def selector_of(self, request: Request) -> CatalogSelector:
+        """Selector of the page, for browsers to wait for or extract the content."""
+        return self.selector
+
+    def search_url(self, area: AdministrativeArea, page: int | None = None) -> str:
+        """URL of a page of the search results of an area."""
+        return alibaba_search_url(area.address, page=page)
 
     @override
     def start_requests(self) -> Iterable[Request]:
@@ -25,24 +86,40 @@ class CatalogSpider(Spider):
         # for each area, there should be more requests yielded by the `parse` method, as
         # we only starts with the first pages of a single area's search results.
         for node in administrative_nodes():
-            yield Request(alibaba_search_url(node.address), meta={"area": node})
+            if not self.partition.owns_area(node):
+                continue
+            if not self.partition.owns(node.address):
+                continue
+            self._progress[node] = _AreaProgress("serial", time.monotonic())
+            yield self._page_request(self.search_url(node), node, 1)
 
     @override
     def parse(self, response: Response) -> Iterable[Request | CatalogItem]:
-        xpaths: dict[str, str] = CONFIG["xpath"]["catalog"]
         area: AdministrativeArea = response.meta["area"]
+        page: int = response.meta.get("page", 1)
+        with timed(self.crawler, "parse/catalog"):
+            root = document_of(response)
+            cards = self.selector.cards(root)
 
-        # checks if there's next page
-        next_page = response.xpath(xpaths["next-page-link"]).extract_first()
-        if next_page:
-            yield Request(url="https://alibaba.com" + next_page, meta={"area": area})
+        # the first page tells how many pages to request at once. Otherwise, or if
+        # the pages are requested at once already, checks if there's next page.
+        pages = self.selector.pages(root) if self.parallel and page == 1 else None
+        if pages is not None:
+            self._expect(area, pages - 1, "parallel")
+            for i in range(2, pages + 1):
+                yield self._page_request(self.search_url(area, i), area, i, True)
+        elif not response.meta.get("fanned_out", False):
+            next_page = self.selector.next_page(root)
+            if next_page:
+                self._expect(area, 1)
+                url = "https://alibaba.com" + next_page
+                yield self._page_request(url, area, page + 1)
 
         # every card contains some information about the supplier
-        cards = response.xpath(xpaths["card"])
         for card in cards:
-            detail_url = card.xpath(xpaths["detail-url"]).extract_first()
-            name = card.xpath(xpaths["name"]).extract_first()
-            products = card.xpath(xpaths["products"]).extract_first()  # may be None
+            detail_url = card["detail-url"]
+            name = card["name"]
+            products = card["products"]  # may be None
 
             # validate data
             if detail_url is None or name is None:
@@ -58,3 +135,49 @@ class CatalogSpider(Spider):
                     "area": area,
                 }
             )
+        self._done(area)
+
+    def page_failed(self, failure: Failure) -> None:
+        self._done(failure.request.meta["area"])
+
+    def _page_request(
+        self,
+        url: str,
+        area: AdministrativeArea,
+        page: int,
+        fanned_out: bool = False,
+    ) -> Request:
+        meta = {"area": area, "page": page, "fanned_out": fanned_out}
+        return Request(url, meta=meta, errback=self.page_failed)
+
+    def _expect(
+        self,
+        area: AdministrativeArea,
+        pages: int,
+        mode: str | None = None,
+    ) -> None:
+        # progress is lost on restart, after which the latency is meaningless.
+        progress = self._progress.get(area)
+        if progress is None:
+            return
+        progress.pending += pages
+        if mode is not None:
+            progress.mode = mode
+
+    def _done(self, area: AdministrativeArea) -> None:
+        progress = self._progress.get(area)
+        if progress is None:
+            return
+        progress.pending -= 1
+        progress.pages += 1
+        if progress.pending > 0:
+            return
+        del self._progress[area]
+
+        seconds = round(time.monotonic() - progress.started, 3)
+        prefix = f"pagination/{progress.mode}"
+        stats = self.crawler.stats
+        stats.set_value(f"{prefix}/{area.address}/seconds", seconds)
+        stats.set_value(f"{prefix}/{area.address}/pages", progress.pages)
+        stats.inc_value(f"{prefix}/areas")
+        stats.inc_value(f"{prefix}/seconds", seconds)
@@ -1,89 +1,297 @@
-import pickle
+import hashlib
+import time
 from dataclasses import asdict
-from typing import Iterable, override
+from typing import Any, Iterable, override
 
 from scrapy import Spider
+from scrapy.crawler import Crawler
 from scrapy.http import Request, Response
 
-from ..conf import CACHE_DIR, CONFIG
-from ..items import Catalog, Detail, DetailItem
-from ..util import AdministrativeArea, search_administrative
+from ..conf import CONFIG
+from ..extensions import timed
+from ..frontier import frontier_worker
+from ..items import Catalog, CatalogKey, Detail, DetailItem
+from ..storage import open_store, store_partitions
+from ..util import (
+    AdministrativeArea,
+    DetailSelector,
+    FreshnessPolicy,
+    Partition,
+    document_of,
+    search_administrative,
+)
 
 __all__ = ["DetailSpider"]
 
+# a catalog of an area to crawl the detail of, with the previous detail if it's stale.
+PendingCatalog = tuple[AdministrativeArea, Catalog, Detail | None]
+
 
 class DetailSpider(Spider):
+    """
+    Crawls the details of suppliers in the catalogs store.
+
+    Spider arguments ``shard`` and ``areas`` select a partition of the suppliers (see
+    :class:`Partition`), sharded by their identities (see :attr:`Catalog.supplier`).
+
+    Parent areas return the same suppliers as their children, so the catalogs of a
+    supplier in different areas are crawled by a single request, and its detail is
+    attached to all the areas. Page loads saved are counted as ``dedup/saved``.
+
+    Suppliers crawled before are skipped, unless the incremental mode is enabled in the
+    ``incremental`` section of configuration: then they're crawled again when stale by
+    the :class:`FreshnessPolicy`.
+    """
+
     name = "detail"
     allowed_domains = ["alibaba.com"]
+    selector: DetailSelector
+    partition: Partition
+    freshness: FreshnessPolicy | None
+
+    def __init__(
+        self,
+        *args: Any,
+        shard: str | None = None,
+        areas: str | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.selector = DetailSelector(CONFIG["xpath"]["detail"])
+        self.partition = Partition.parse(shard, areas, frontier_worker())
+        self.freshness = incremental_freshness()
+
+    def has_content(self, response: Response) -> bool:
+        """Whether the page is completely rendered."""
+        return self.selector.has_content(document_of(response))
+
+    def selector_of(self, request: Request) -> DetailSelector:
+        """Selector of the page, for browsers to wait for or extract the content."""
+        return self.selector
+
+    @staticmethod
+    def request_of(
+        area: AdministrativeArea,
+        catalog: Catalog,
+        previous: Detail | None = None,
+        duplicates: list[PendingCatalog] | None = None,
+    ) -> Request:
+        """
+        Request of the detail page of a catalog, parsed by :meth:`parse`.
+        ``previous`` is the stale detail to refresh, if any. ``duplicates`` are the
+        catalogs of the same supplier in other areas, which get the same detail.
+
+        Pages crawled before are requested again when refreshed, so requests of stale
+        details are not filtered by the fingerprints of the former ones.
+        """
+        meta = {
+            "catalog": catalog,
+            "area": area,
+            "previous": previous,
+        }
+        if duplicates:
+            meta["duplicates"] = duplicates
+        stale = [previous, *(stale for _, _, stale in duplicates or [])]
+        refresh = any(detail is not None for detail in stale)
+        return Request(url=catalog.detail_url, meta=meta, dont_filter=refresh)
+
+    def is_stale(self, detail: Detail, now: float | None = None) -> bool:
+        """Whether a crawled detail should be crawled again."""
+        if self.freshness is None:
+            return False
+        return self.freshness.is_stale(detail.fetched_at, detail.changes, now)
 
     @override
     def start_requests(self) -> Iterable[Request]:
-        # load catalogs data to start crawling.
-        with open(CACHE_DIR / "catalogs.pickle", "rb") as f:
-            catalogs_cache: dict[AdministrativeArea, list[Catalog]] = pickle.load(f)
-
         # if there's already part of the details, de-duplicate them.
-        cache_path = CACHE_DIR / "details.pickle"
-        if cache_path.exists():
-            with open(cache_path, "rb") as f:
-                details_cache: dict[AdministrativeArea, list[Detail]] = pickle.load(f)
-            for area, details in details_cache.items():
-                print(f"=== Skipping {len(details)} records in area {area.name} ===")
-
-                # eliminate duplicate targets.
-                #
-                # due to the concurrency inside Scrapy, we cannot assume that DetailItems
-                # are saved in the same order of CatalogItems.
-                targets: list[Catalog] = []
-                for catalog in catalogs_cache[area]:
-                    has_requested = False
-                    for detail in details:
-                        if detail.is_result_of(catalog):
-                            # print(f" >> Skipped {detail.detail_url}")
-                            has_requested = True
-                            break
-                    if not has_requested:
-                        targets.append(catalog)
-                catalogs_cache[area] = targets
-
-        # yield requests to the engine.
-        for area, catalogs in catalogs_cache.items():
-            for catalog in catalogs:
-                meta = {
-                    "catalog": catalog,
-                    "area": area,
-                }
-                yield Request(url=catalog.detail_url, meta=meta)
+        #
+        # due to the concurrency inside Scrapy, we cannot assume that DetailItems are
+        # saved in the same order of CatalogItems.
+        index = crawled_details(self.partition)
+
+        # stream catalogs data to start crawling.
+        now = time.time()
+        skipped: dict[AdministrativeArea, int] = {}
+        refreshed: dict[AdministrativeArea, int] = {}
+        pending: list[PendingCatalog] = []
+        for area, catalog in open_store("catalogs"):
+            if not self.partition.owns_area(area):
+                continue
+            if not self.partition.owns(catalog.supplier):
+                continue
+            previous = index.get((area, catalog.key))
+            if previous is not None:
+                if not self.is_stale(previous, now):
+                    skipped[area] = skipped.get(area, 0) + 1
+                    continue
+                refreshed[area] = refreshed.get(area, 0) + 1
+            pending.append((area, catalog, previous))
+
+        # the same supplier is searched in parent and child areas, but crawled once.
+        groups = group_by_supplier(pending)
+        saved = len(pending) - len(groups)
+        self.crawler.stats.inc_value("dedup/saved", saved)
+
+        stats = self.crawler.stats
+        for area, count in skipped.items():
+            stats.inc_value("incremental/skipped", count)
+            self.logger.info(f"Skipped {count} records in area {area.name}")
+        for area, count in refreshed.items():
+            stats.inc_value("incremental/refreshed", count)
+            self.logger.info(f"Refreshing {count} stale records in area {area.name}")
+        if saved > 0:
+            self.logger.info(f"Saved {saved} page loads of suppliers in multiple areas")
+
+        for (area, catalog, previous), *duplicates in groups:
+            yield self.request_of(area, catalog, previous, duplicates)
 
     @override
     def parse(self, response: Response) -> Iterable[DetailItem]:
-        xpaths = CONFIG["xpath"]["detail"]
-        catalog: Catalog = response.meta["catalog"]
-        area: AdministrativeArea = response.meta["area"]
+        yield from detail_items(response, self.selector, self.crawler)
+
+
+def incremental_freshness() -> FreshnessPolicy | None:
+    """The freshness policy of crawled details, if the incremental mode is enabled."""
+    options: dict = CONFIG.get("incremental", {})
+    if not options.get("enabled", False):
+        return None
+    return FreshnessPolicy.from_config(options)
 
-        bill = _fuzzy_select(response, xpaths["bill"])
-        address = _fuzzy_select(response, xpaths["address"])
-        orders = _fuzzy_select(response, xpaths["orders"])
+
+def crawled_details(
+    partition: Partition,
+) -> dict[tuple[AdministrativeArea, CatalogKey], Detail]:
+    """
+    The latest crawled detail of each area and key, indexed once so that each catalog
+    is checked in constant time. Details crawled by the partition are not merged into
+    the main store yet, so they're read from the stores of the partition as well.
+    """
+    index: dict[tuple[AdministrativeArea, CatalogKey], Detail] = {}
+    for name in store_names("details", partition):
+        for area, detail in open_store("details", name):
+            index[(area, detail.key)] = detail
+    return index
+
+
+def store_names(store: str, partition: Partition) -> list[str | None]:
+    """
+    Partitions of a store to read for the partition, from the main one to that of the
+    partition itself, including those of the other workers of it (see
+    :attr:`Partition.worker`), which are not merged yet either.
+    """
+    names: list[str | None] = [None]
+    if partition.worker is not None:
+        for name in store_partitions(store):
+            if partition.is_worker_of(name) and name != partition.name:
+                names.append(name)
+    if partition.name is not None:
+        names.append(partition.name)
+    return names
+
+
+def group_by_supplier(
+    pending: Iterable[PendingCatalog],
+) -> list[list[PendingCatalog]]:
+    """
+    Groups catalogs by their suppliers (see :attr:`Catalog.supplier`), in the order
+    the suppliers first appear. Parent areas return the same suppliers as their
+    children, whose detail page needs to be loaded only once.
+    """
+    groups: dict[str, list[PendingCatalog]] = {}
+    for target in pending:
+        supplier = target[1].supplier
+        if supplier not in groups.keys():
+            groups[supplier] = []
+        groups[supplier].append(target)
+    return list(groups.values())
+
+
+def detail_fields(
+    response: Response,
+    selector: DetailSelector,
+    crawler: Crawler,
+) -> dict[str, str]:
+    with timed(crawler, "parse/detail"):
+        return selector.extract(document_of(response))
+
+
+def detail_items(
+    response: Response,
+    selector: DetailSelector,
+    crawler: Crawler,
+) -> Iterable[DetailItem]:
+    """
+    Extracts the detail of the catalog in the meta of the request, and of its
+    ``duplicates`` (catalogs of the same supplier in other areas) in the meta.
+    """
+    fields = detail_fields(response, selector, crawler)
+    fetched_at = fetched_time(response)
+    for area, catalog, previous in pending_of(response):
+        yield detail_item(area, catalog, previous, fields, fetched_at, crawler)
+
+
+def fetched_time(response: Response) -> float:
+    """
+    When the page of a response was fetched, which is when it was cached if replayed
+    from the page cache (see :class:`src.middlewares.PageCacheMiddleware`).
+    """
+    return response.meta.get("cached_at") or time.time()
+
+
+def pending_of(response: Response) -> list[PendingCatalog]:
+    """The catalog of the request of a detail page, and its duplicates."""
+    meta = response.meta
+    first = (meta["area"], meta["catalog"], meta.get("previous"))
+    return [first, *meta.get("duplicates", [])]
+
+
+def detail_item(
+    area: AdministrativeArea,
+    catalog: Catalog,
+    previous: Detail | None,
+    fields: dict[str, str],
+    fetched_at: float,
+    crawler: Crawler,
+) -> DetailItem:
+    """
+    The detail of a catalog with the fields extracted from its page fetched at
+    ``fetched_at``, comparing it with the ``previous`` detail if it's refreshed.
+    """
+    bill = fields["bill"]
+    address = fields["address"]
+    orders = fields["orders"]
+    with timed(crawler, "search-administrative"):
         administrative_address = search_administrative([address, catalog.name])
 
-        yield DetailItem(
-            {
-                "detail": Detail(
-                    **asdict(catalog),
-                    administrative_address=administrative_address,
-                    bill=bill,
-                    orders=orders,
-                ),
-                "area": area,
-            }
-        )
-
-
-def _fuzzy_select(response: Response, xpath: str | list[str]) -> str:
-    if isinstance(xpath, str):
-        xpath = [xpath]
-    for x in xpath:
-        result = response.xpath(x).extract_first()
-        if result:
-            return result
-    return ""
+    content_hash = _content_hash(bill, address, orders)
+    changes = 0
+    if previous is not None:
+        # records crawled by previous versions have nothing to compare with.
+        changes = previous.changes
+        if previous.content_hash == content_hash:
+            crawler.stats.inc_value("incremental/unchanged")
+        elif previous.content_hash is not None:
+            crawler.stats.inc_value("incremental/changed")
+            changes += 1
+
+    return DetailItem(
+        {
+            "detail": Detail(
+                **asdict(catalog),
+                administrative_address=administrative_address,
+                bill=bill,
+                orders=orders,
+                fetched_at=fetched_at,
+                content_hash=content_hash,
+                changes=changes,
+            ),
+            "area": area,
+        }
+    )
+
+
+def _content_hash(*fields: str | None) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for field in fields:
+        digest.update(b"\x00" if field is None else field.encode() + b"\x01")
+    return digest.hexdigest()
@@ -0,0 +1,229 @@
+import pathlib
+import shutil
+import time
+from typing import Any, Iterable, Self, override
+
+from scrapy import Request, Spider, signals
+from scrapy.crawler import Crawler
+from scrapy.http import Response
+from scrapy.settings import Settings
+from twisted.python.failure import Failure
+
+from ..conf import CACHE_DIR, CONFIG
+from ..items import Catalog, CatalogKey, CatalogItem, Detail, DetailItem
+from ..storage import open_store
+from ..util import (
+    AdministrativeArea,
+    CatalogSelector,
+    DetailSelector,
+    FreshnessPolicy,
+    document_of,
+)
+from .catalog import CatalogSpider
+from .detail import (
+    DetailSpider,
+    PendingCatalog,
+    crawled_details,
+    detail_fields,
+    detail_item,
+    fetched_time,
+    group_by_supplier,
+    incremental_freshness,
+    pending_of,
+    store_names,
+)
+
+__all__ = ["SupplierSpider"]
+
+
+class SupplierSpider(CatalogSpider):
+    """
+    Crawls the search results and the details of suppliers in one run.
+
+    The detail page of every catalog is requested as soon as the catalog is parsed,
+    instead of after all search results are crawled. Search result pages are requested
+    with ``page_priority``, higher than detail pages, so that there are always
+    catalogs in queue.
+
+    Both catalogs and details are saved to their stores, so either stage can be resumed
+    by :class:`CatalogSpider` or :class:`DetailSpider` as well. When started again,
+    catalogs in stores whose details are not crawled (or stale, see
+    :class:`DetailSpider`) are requested first. Pending requests are checkpointed in
+    ``JOBDIR`` (``cache/jobs/`` by default), which is removed when the crawl finishes.
+
+    As :class:`DetailSpider` does, the detail of a supplier found in several areas is
+    crawled once and attached to all of them: catalogs arriving while the detail is
+    requested wait for it, and catalogs arriving later get the fields extracted then.
+    Fields extracted, and when they were fetched, are kept in the state of the job, so
+    they survive restarts along with the pending requests.
+
+    With ``shard``, details of suppliers owned by other shards (see
+    :meth:`Partition.owns`) are left to them, as areas of different shards find the
+    same suppliers. Those found only by this shard are crawled from the merged catalogs
+    store the next time.
+    """
+
+    name = "supplier"
+    page_priority = 10
+    detail_selector: DetailSelector
+    freshness: FreshnessPolicy | None
+    details: dict[tuple[AdministrativeArea, CatalogKey], Detail]
+    fetched: dict[str, dict[str, str]]
+    fetched_at: dict[str, float]
+    waiting: dict[str, list[PendingCatalog]]
+    finished: bool
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.detail_selector = DetailSelector(CONFIG["xpath"]["detail"])
+        self.freshness = incremental_freshness()
+        self.details = {}
+        self.fetched = {}
+        self.fetched_at = {}
+        self.waiting = {}
+        self.finished = False
+
+    @classmethod
+    def update_settings(cls, settings: Settings) -> None:
+        super().update_settings(settings)
+        # catalogs are saved along with details, besides other pipelines of the project
+        # (e.g. feeding the shared frontier).
+        pipelines = settings.getdict("ITEM_PIPELINES")
+        pipelines["src.pipelines.CatalogItemPipeline"] = 300
+        pipelines["src.pipelines.DetailItemPipeline"] = 310
+        settings.set("ITEM_PIPELINES", pipelines, "spider")
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler, *args: Any, **kwargs: Any) -> Self:
+        spider = super().from_crawler(crawler, *args, **kwargs)
+
+        # the shared frontier is a checkpoint itself.
+        frontier = CONFIG.get("frontier", {}).get("enabled", False)
+        if not frontier and not crawler.settings.get("JOBDIR"):
+            name = ".".join(filter(None, [cls.name, spider.partition.name]))
+            crawler.settings.set("JOBDIR", str(CACHE_DIR / "jobs" / name), "spider")
+        crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(spider.engine_stopped, signal=signals.engine_stopped)
+        return spider
+
+    @override
+    def has_content(self, response: Response) -> bool:
+        if "catalog" in response.meta:
+            return self.detail_selector.has_content(document_of(response))
+        return super().has_content(response)
+
+    @override
+    def selector_of(self, request: Request) -> CatalogSelector | DetailSelector:
+        if "catalog" in request.meta:
+            return self.detail_selector
+        return super().selector_of(request)
+
+    @override
+    def start_requests(self) -> Iterable[Request]:
+        # restored from the state of the job (see the `JOBDIR` setting) if resumed, as
+        # requests of suppliers fetched before are filtered if sent again.
+        state = getattr(self, "state", {})
+        self.fetched = state.setdefault("fetched", self.fetched)
+        self.fetched_at = state.setdefault("fetched_at", self.fetched_at)
+        # catalogs waiting for details when the job stopped are requested again, as
+        # requests in flight were seen by the job but not saved to its queue.
+        jobdir = bool(self.crawler.settings.get("JOBDIR"))
+
+        # the stores are read before anything is appended by the pipelines.
+        self.details = crawled_details(self.partition)
+        pending: list[PendingCatalog] = []
+        now = time.time()
+        for name in store_names("catalogs", self.partition):
+            for area, catalog in open_store("catalogs", name):
+                if not self.partition.owns_area(area):
+                    continue
+                if not self.partition.owns(catalog.supplier):
+                    continue
+                if self._is_pending(area, catalog, now):
+                    previous = self.details.get((area, catalog.key))
+                    pending.append((area, catalog, previous))
+
+        groups = group_by_supplier(pending)
+        self.crawler.stats.inc_value("dedup/saved", len(pending) - len(groups))
+        for (area, catalog, previous), *duplicates in groups:
+            request = self._detail_request(area, catalog, previous, duplicates)
+            yield request.replace(dont_filter=request.dont_filter or jobdir)
+        for request in super().start_requests():
+            yield request.replace(priority=self.page_priority)
+
+    @override
+    def parse(self, response: Response) -> Iterable[Request | CatalogItem]:
+        for output in super().parse(response):
+            if isinstance(output, Request):
+                yield output.replace(priority=self.page_priority)
+                continue
+            yield output
+
+            area: AdministrativeArea = output["area"]
+            catalog: Catalog = output["catalog"]
+            if not self.partition.owns(catalog.supplier):
+                continue
+            if not self._is_pending(area, catalog):
+                continue
+            previous = self.details.get((area, catalog.key))
+            supplier = catalog.supplier
+            if supplier in self.fetched.keys():
+                self.crawler.stats.inc_value("dedup/saved")
+                fields = self.fetched[supplier]
+                # states of jobs started by previous versions have no fetch times.
+                fetched_at = self.fetched_at.get(supplier) or time.time()
+                yield detail_item(
+                    area, catalog, previous, fields, fetched_at, self.crawler
+                )
+            elif supplier in self.waiting.keys():
+                self.crawler.stats.inc_value("dedup/saved")
+                self.waiting[supplier].append((area, catalog, previous))
+            else:
+                yield self._detail_request(area, catalog, previous)
+
+    def parse_detail(self, response: Response) -> Iterable[DetailItem]:
+        fields = detail_fields(response, self.detail_selector, self.crawler)
+        supplier = response.meta["catalog"].supplier
+        fetched_at = fetched_time(response)
+        self.fetched[supplier] = fields
+        self.fetched_at[supplier] = fetched_at
+        pending = pending_of(response) + self.waiting.pop(supplier, [])
+        for area, catalog, previous in pending:
+            yield detail_item(area, catalog, previous, fields, fetched_at, self.crawler)
+
+    def detail_failed(self, failure: Failure) -> None:
+        # catalogs waiting for the detail are crawled the next time.
+        self.waiting.pop(failure.request.meta["catalog"].supplier, None)
+
+    def spider_closed(self, spider: Spider, reason: str) -> None:
+        self.finished = reason == "finished"
+
+    def engine_stopped(self) -> None:
+        # removed after extensions save the state into it on spider_closed.
+        jobdir = self.crawler.settings.get("JOBDIR")
+        if self.finished and jobdir:
+            shutil.rmtree(pathlib.Path(jobdir), ignore_errors=True)
+
+    def _is_pending(
+        self,
+        area: AdministrativeArea,
+        catalog: Catalog,
+        now: float | None = None,
+    ) -> bool:
+        previous = self.details.get((area, catalog.key))
+        if previous is None:
+            return True
+        if self.freshness is None:
+            return False
+        return self.freshness.is_stale(previous.fetched_at, previous.changes, now)
+
+    def _detail_request(
+        self,
+        area: AdministrativeArea,
+        catalog: Catalog,
+        previous: Detail | None,
+        duplicates: list[PendingCatalog] | None = None,
+    ) -> Request:
+        self.waiting[catalog.supplier] = []
+        request = DetailSpider.request_of(area, catalog, previous, duplicates)
+        return request.replace(callback=self.parse_detail, errback=self.detail_failed)
@@ -0,0 +1,7 @@
+from .base import *  # noqa: F403
+from .log import *  # noqa: F403
+from .cookies import *  # noqa: F403
+from .pages import *  # noqa: F403
+from .snapshot import *  # noqa: F403
+from .sqlite import *  # noqa: F403
+from .factory import *  # noqa: F403
@@ -0,0 +1,56 @@
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+from ..items import Catalog
+from ..util import AdministrativeArea, administrative_nodes
+
+__all__ = ["ItemStore"]
+
+
+class ItemStore[T: Catalog](ABC):
+    """
+    Storage backend of crawled records, grouped by administrative areas.
+
+    Records are appended one by one as the pipelines receive them, and read back lazily
+    by iterating the store. Implementations decide how (and how often) the records reach
+    the disk; :meth:`close` must persist everything appended so far.
+    """
+
+    @abstractmethod
+    def append(self, area: AdministrativeArea, record: T) -> None: ...
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[tuple[AdministrativeArea, T]]: ...
+
+    def flush(self) -> None:
+        """Persist the appended records. Does nothing by default."""
+
+    def close(self) -> None:
+        """Persist the appended records and release the resources."""
+        self.flush()
+
+    def of_area(self, area: AdministrativeArea) -> Iterator[T]:
+        """Records of the given area."""
+        for record_area, record in self:
+            if record_area == area:
+                yield record
+
+    def count_by_area(self) -> dict[AdministrativeArea, int]:
+        counts: dict[AdministrativeArea, int] = {}
+        for area, _ in self:
+            counts[area] = counts.get(area, 0) + 1
+        return counts
+
+
+def _resolve_area(address: str, name: str) -> AdministrativeArea:
+    """
+    Finds the configured area node of the given identity.
+
+    Stores persist only the identity of areas rather than the whole subtree, which is
+    resolved against the configuration when reading. Areas that are no longer
+    configured are restored without children.
+    """
+    for node in administrative_nodes():
+        if node.address == address and node.name == name:
+            return node
+    return AdministrativeArea(address, name, None)
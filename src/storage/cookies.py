@@ -0,0 +1,92 @@
+import json
+import os
+import pathlib
+import threading
+import time
+from urllib.parse import urlparse
+
+from ..conf import CACHE_DIR, CONFIG
+
+__all__ = ["CookieStore", "open_cookie_store"]
+
+
+class CookieStore(object):
+    """
+    Cookies of browser sessions (e.g. those of passed captchas), kept across restarts in
+    a JSON file.
+
+    Cookies are dicts in the format of WebDriver (``name``, ``value``, ``domain``,
+    ``path``, ``expiry``, ``secure``, ``httpOnly`` and ``sameSite``), keyed by their
+    domain, path and name, and expired ones are dropped. Browsers launch in threads, so
+    the store is locked.
+    """
+
+    path: pathlib.Path
+    _cookies: dict[tuple[str, str, str], dict]
+    _changed: bool
+    _lock: threading.Lock
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._cookies = {}
+        self._changed = False
+        self._lock = threading.Lock()
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                self.update(json.load(f))
+            self._changed = False
+
+    def update(self, cookies: list[dict]) -> None:
+        """Adds cookies, replacing those of the same domain, path and name."""
+        with self._lock:
+            for cookie in cookies:
+                key = (cookie["domain"], cookie.get("path", "/"), cookie["name"])
+                if self._cookies.get(key) != cookie:
+                    self._cookies[key] = cookie
+                    self._changed = True
+
+    def cookies(self, url: str | None = None) -> list[dict]:
+        """Unexpired cookies, of those sent to the URL if specified."""
+        now = time.time()
+        with self._lock:
+            cookies = [
+                cookie
+                for cookie in self._cookies.values()
+                if cookie.get("expiry") is None or cookie["expiry"] > now
+            ]
+        if url is None:
+            return cookies
+        url = urlparse(url)
+        return [
+            cookie
+            for cookie in cookies
+            if _domain_matches(url.hostname or "", cookie["domain"])
+            and url.path.startswith(cookie.get("path", "/"))
+            and (url.scheme == "https" or not cookie.get("secure", False))
+        ]
+
+    def save(self) -> None:
+        """Writes the unexpired cookies to the file, if anything changed."""
+        if not self._changed:
+            return
+        cookies = self.cookies()
+        self._changed = False
+        # written aside and renamed, as browsers may be launching from the file.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(cookies, f, ensure_ascii=False, indent=2)
+        os.replace(temp, self.path)
+
+
+def _domain_matches(host: str, domain: str) -> bool:
+    # cookies of domains starting with a dot are sent to subdomains as well.
+    if not domain.startswith("."):
+        return host == domain
+    return host == domain[1:] or host.endswith(domain)
+
+
+def open_cookie_store() -> CookieStore:
+    """Opens the cookie store specified in the ``session`` section of configuration."""
+    options = CONFIG.get("session", {})
+    return CookieStore(CACHE_DIR / options.get("cookies", "cookies.json"))
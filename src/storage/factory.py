@@ -0,0 +1,82 @@
+import pathlib
+
+from ..conf import CACHE_DIR, CONFIG
+from ..items import Catalog, Detail
+from .base import ItemStore
+from .log import RecordLogStore
+from .snapshot import SnapshotStore
+from .sqlite import SqliteStore
+
+__all__ = ["open_store", "store_partitions"]
+
+_RECORD_TYPES: dict[str, type[Catalog]] = {"catalogs": Catalog, "details": Detail}
+
+
+def open_store(name: str, partition: str | None = None) -> ItemStore:
+    """
+    Opens the store of the given name (``catalogs`` or ``details``) in the cache
+    directory, using the backend specified in the ``storage`` section of configuration.
+
+    A ``partition`` (see :attr:`src.util.Partition.name`) is stored in its own files, so
+    that crawlers of different partitions do not write the same files.
+
+    When a log-based or SQLite store is opened for the first time, records in the legacy
+    pickle cache of the same name are imported into it.
+    """
+    options: dict = CONFIG.get("storage", {})
+    backend = options.get("backend", "log")
+    legacy_path = CACHE_DIR / f"{name}.pickle"
+
+    match backend:
+        case "pickle":
+            return SnapshotStore(_path(name, partition, "pickle"))
+        case "log":
+            path = _path(name, partition, "log")
+            store = RecordLogStore(
+                path,
+                fsync_batch=options.get("fsync-batch", 64),
+                fsync_interval=options.get("fsync-interval", 5.0),
+                compact_every=options.get("compact-every", 0),
+                compact_ratio=options.get("compact-ratio", 0.5),
+            )
+            if partition is None and not path.exists() and legacy_path.exists():
+                for area, record in SnapshotStore(legacy_path):
+                    store.append(area, record)
+                store.close()
+            return store
+        case "sqlite":
+            store = SqliteStore(
+                _path("crawl", partition, "sqlite3"),
+                name,
+                _RECORD_TYPES[name],
+                batch_size=options.get("fsync-batch", 64),
+            )
+            if partition is None and legacy_path.exists():
+                if not store.count_by_area():
+                    for area, record in SnapshotStore(legacy_path):
+                        store.append(area, record)
+                    store.flush()
+            return store
+        case _:
+            raise ValueError(f"unknown storage backend {backend!r}")
+
+
+def store_partitions(name: str) -> list[str]:
+    """Names of the existing partitions of the store of the given name."""
+    backend = CONFIG.get("storage", {}).get("backend", "log")
+    stem, suffix = {
+        "pickle": (name, "pickle"),
+        "log": (name, "log"),
+        "sqlite": ("crawl", "sqlite3"),
+    }[backend]
+    partitions = []
+    for path in sorted(CACHE_DIR.glob(f"{stem}.*.{suffix}")):
+        partitions.append(path.name[len(stem) + 1 : -len(suffix) - 1])
+    return partitions
+
+
+def _path(stem: str, partition: str | None, suffix: str) -> pathlib.Path:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    if partition is None:
+        return CACHE_DIR / f"{stem}.{suffix}"
+    return CACHE_DIR / f"{stem}.{partition}.{suffix}"
@@ -0,0 +1,198 @@
+import os
+import pathlib
+import pickle
+import struct
+import time
+import zlib
+from typing import BinaryIO, Iterator, override
+
+from ..items import Catalog, CatalogKey
+from ..util import AdministrativeArea
+from .base import ItemStore, _resolve_area
+
+__all__ = ["RecordLogStore"]
+
+# every record is framed as: payload length, CRC32 of payload, pickled payload.
+_HEADER = struct.Struct(">II")
+
+
+class RecordLogStore[T: Catalog](ItemStore[T]):
+    """
+    Append-only log of length-prefixed, checksummed records.
+
+    Each record is written to the OS as soon as it is appended, so killing the process
+    loses nothing; ``fsync`` is batched every ``fsync_batch`` records or
+    ``fsync_interval`` seconds to bound the loss on power failure. A partially written
+    tail (the process died in the middle of a write) is detected by its length or
+    checksum and truncated when the log is opened again.
+
+    Records superseded by later ones with the same area and key are dropped by
+    :meth:`compact`. It's checked every ``compact_every`` appends and when the store is
+    closed, and the log is rewritten only if at least ``compact_ratio`` of its records
+    are superseded.
+    """
+
+    path: pathlib.Path
+    fsync_batch: int
+    fsync_interval: float
+    compact_every: int
+    compact_ratio: float
+    _file: BinaryIO | None
+    _unsynced: int
+    _last_sync: float
+    _since_compact: int
+    _offsets: dict[tuple[str, str, CatalogKey], int]
+    _frames: int
+    _size: int
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        *,
+        fsync_batch: int = 64,
+        fsync_interval: float = 5.0,
+        compact_every: int = 0,
+        compact_ratio: float = 0.5,
+    ) -> None:
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.compact_ratio = compact_ratio
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._since_compact = 0
+        self._offsets = {}
+        self._frames = 0
+        self._size = 0
+
+    @override
+    def append(self, area: AdministrativeArea, record: T) -> None:
+        if self._file is None:
+            self._file = self._open_for_append()
+        frame = _frame(area, record)
+        self._file.write(frame)
+        self._offsets[(area.address, area.name, record.key)] = self._size
+        self._frames += 1
+        self._size += len(frame)
+
+        self._unsynced += 1
+        self._since_compact += 1
+        if (
+            self._unsynced >= self.fsync_batch
+            or time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self.flush()
+        if self.compact_every > 0 and self._since_compact >= self.compact_every:
+            self._since_compact = 0
+            if self._worth_compacting():
+                self.compact()
+
+    @override
+    def __iter__(self) -> Iterator[tuple[AdministrativeArea, T]]:
+        if not self.path.exists():
+            return
+        areas: dict[tuple[str, str], AdministrativeArea] = {}
+        with open(self.path, "rb") as f:
+            for address, name, record in _read_frames(f):
+                if (address, name) not in areas.keys():
+                    areas[(address, name)] = _resolve_area(address, name)
+                yield areas[(address, name)], record
+
+    @override
+    def flush(self) -> None:
+        if self._file is not None and self._unsynced > 0:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @override
+    def close(self) -> None:
+        if self._file is None:
+            return
+        if self._worth_compacting():
+            self.compact()
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def compact(self) -> None:
+        """
+        Rewrites the log, keeping only the latest record of each area and key.
+
+        Latest records are found by their offsets, indexed while the log is opened and
+        appended to, and their frames are copied as they are, without unpickling. The
+        compacted log is written aside and atomically replaces the original one, so a
+        crash during compaction leaves the original log intact.
+        """
+        opened = self._file is not None
+        if not opened:
+            self._file = self._open_for_append()
+
+        if len(self._offsets) < self._frames:
+            self.flush()
+            temp = self.path.with_suffix(self.path.suffix + ".compact")
+            offsets: dict[tuple[str, str, CatalogKey], int] = {}
+            latest = sorted(self._offsets.items(), key=lambda item: item[1])
+            with open(self.path, "rb") as source, open(temp, "wb") as f:
+                for key, offset in latest:
+                    source.seek(offset)
+                    header = source.read(_HEADER.size)
+                    length, _ = _HEADER.unpack(header)
+                    offsets[key] = f.tell()
+                    f.write(header)
+                    f.write(source.read(length))
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            # closed before replaced, which is not allowed on Windows otherwise.
+            self._file.close()
+            os.replace(temp, self.path)
+            self._file = open(self.path, "ab", buffering=0)
+            self._offsets = offsets
+            self._frames = len(offsets)
+            self._size = size
+        self._since_compact = 0
+
+        if not opened:
+            self._file.close()
+            self._file = None
+
+    def _worth_compacting(self) -> bool:
+        superseded = self._frames - len(self._offsets)
+        return superseded > 0 and superseded >= self.compact_ratio * self._frames
+
+    def _open_for_append(self) -> BinaryIO:
+        # index the latest record of each area and key for compaction, and truncate the
+        # torn tail left by a crash, so that new records are not appended after garbage.
+        self._offsets = {}
+        self._frames = 0
+        valid = 0
+        if self.path.exists():
+            with open(self.path, "rb") as f:
+                for address, name, record in _read_frames(f):
+                    self._offsets[(address, name, record.key)] = valid
+                    self._frames += 1
+                    valid = f.tell()
+            if valid < self.path.stat().st_size:
+                os.truncate(self.path, valid)
+        self._size = valid
+        return open(self.path, "ab", buffering=0)
+
+
+def _frame(area: AdministrativeArea, record: Catalog) -> bytes:
+    payload = pickle.dumps((area.address, area.name, record))
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frames(file: BinaryIO) -> Iterator[tuple[str, str, Catalog]]:
+    while True:
+        header = file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        length, checksum = _HEADER.unpack(header)
+        payload = file.read(length)
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return
+        yield pickle.loads(payload)
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import pathlib
+import pickle
+import sqlite3
+import zlib
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from ..conf import CACHE_DIR, CONFIG
+
+__all__ = ["CachedPage", "PageCache", "open_page_cache"]
+
+
+@dataclass
+class CachedPage(object):
+    url: str
+    status: int
+    headers: dict[bytes, list[bytes]]
+    encoding: str
+    body: bytes
+    request: dict[str, Any]  # see :meth:`scrapy.Request.to_dict`
+    cached_at: float
+
+
+class PageCache(object):
+    """
+    Raw pages downloaded by crawlers, keyed by request fingerprints.
+
+    Bodies are compressed and stored in files named after the SHA-256 of the bodies
+    (content-addressed), so identical pages of different requests are stored once. The
+    index of requests, with the URL, status, headers and the request itself (to be
+    parsed again by the same callback), is a SQLite database in WAL mode, shared by
+    crawler processes.
+    """
+
+    directory: pathlib.Path
+    _connection: sqlite3.Connection
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        self.directory = directory
+        (directory / "objects").mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(directory / "index.sqlite3", timeout=60)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "fingerprint TEXT PRIMARY KEY, spider TEXT NOT NULL, "
+                "url TEXT NOT NULL, status INTEGER NOT NULL, headers BLOB NOT NULL, "
+                "encoding TEXT NOT NULL, digest TEXT NOT NULL, request BLOB NOT NULL, "
+                "cached_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS pages_spider ON pages (spider)"
+            )
+
+    def put(self, fingerprint: str, spider: str, page: CachedPage) -> int:
+        """Caches a page, replacing the former one. Returns bytes written to disk."""
+        digest = hashlib.sha256(page.body).hexdigest()
+        path = self._object_path(digest)
+        written = 0
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            data = zlib.compress(page.body)
+            temp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(temp, "wb") as f:
+                f.write(data)
+            os.replace(temp, path)
+            written = len(data)
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    fingerprint,
+                    spider,
+                    page.url,
+                    page.status,
+                    pickle.dumps(page.headers),
+                    page.encoding,
+                    digest,
+                    pickle.dumps(page.request),
+                    page.cached_at,
+                ),
+            )
+        return written
+
+    def get(self, fingerprint: str) -> CachedPage | None:
+        row = self._connection.execute(
+            "SELECT url, status, headers, encoding, digest, request, cached_at "
+            "FROM pages WHERE fingerprint = ?",
+            (fingerprint,),
+        ).fetchone()
+        if row is None:
+            return None
+        url, status, headers, encoding, digest, request, cached_at = row
+        with open(self._object_path(digest), "rb") as f:
+            body = zlib.decompress(f.read())
+        return CachedPage(
+            url,
+            status,
+            pickle.loads(headers),
+            encoding,
+            body,
+            pickle.loads(request),
+            cached_at,
+        )
+
+    def requests(self, spider: str) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Fingerprints and requests of the pages cached by a spider."""
+        cursor = self._connection.execute(
+            "SELECT fingerprint, request FROM pages WHERE spider = ? ORDER BY rowid",
+            (spider,),
+        )
+        for fingerprint, request in cursor:
+            yield fingerprint, pickle.loads(request)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _object_path(self, digest: str) -> pathlib.Path:
+        return self.directory / "objects" / digest[:2] / digest[2:]
+
+
+def open_page_cache() -> PageCache:
+    """Opens the page cache specified in the ``page-cache`` section of configuration."""
+    return PageCache(CACHE_DIR / CONFIG.get("page-cache", {}).get("path", "pages"))
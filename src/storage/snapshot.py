@@ -0,0 +1,73 @@
+import pathlib
+import pickle
+from typing import Iterator, override
+
+from ..items import Catalog
+from ..util import AdministrativeArea
+from .base import ItemStore
+
+__all__ = ["SnapshotStore"]
+
+
+class SnapshotStore[T: Catalog](ItemStore[T]):
+    """
+    The legacy storage: a pickled ``dict[AdministrativeArea, list[T]]``.
+
+    All records are kept in memory, and the whole dict is rewritten when the store is
+    flushed. Used for compatibility with caches produced by previous versions.
+
+    Appending a record with the key of a record in the same area replaces it in place.
+    """
+
+    path: pathlib.Path
+    items: dict[AdministrativeArea, list[T]]
+    _dirty: bool
+    _positions: dict[AdministrativeArea, dict[tuple, int]]
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.items = {}
+        self._dirty = False
+        self._positions = {}
+        if path.exists():
+            with open(path, "rb") as f:
+                self.items = pickle.load(f)
+
+    @override
+    def append(self, area: AdministrativeArea, record: T) -> None:
+        if area not in self.items.keys():
+            self.items[area] = []
+        records = self.items[area]
+
+        # positions of keys are indexed on the first append to the area.
+        if area not in self._positions.keys():
+            self._positions[area] = {r.key: i for i, r in enumerate(records)}
+        positions = self._positions[area]
+        if record.key in positions.keys():
+            records[positions[record.key]] = record
+        else:
+            positions[record.key] = len(records)
+            records.append(record)
+        self._dirty = True
+
+    @override
+    def __iter__(self) -> Iterator[tuple[AdministrativeArea, T]]:
+        for area, records in self.items.items():
+            for record in records:
+                yield area, record
+
+    @override
+    def of_area(self, area: AdministrativeArea) -> Iterator[T]:
+        yield from self.items.get(area, [])
+
+    @override
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        self._dirty = False
+        with open(self.path, "wb") as file:
+            pickle.dump(self.items, file=file)
+
+    @override
+    def count_by_area(self) -> dict[AdministrativeArea, int]:
+        return {area: len(records) for area, records in self.items.items()}
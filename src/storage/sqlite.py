@@ -0,0 +1,212 @@
+import json
+import pathlib
+import sqlite3
+from dataclasses import MISSING, fields
+from typing import Any, Iterator, get_args, get_origin, get_type_hints, override
+
+from ..items import Catalog
+from ..util import AdministrativeArea
+from .base import ItemStore, _resolve_area
+
+__all__ = ["SqliteStore"]
+
+
+class SqliteStore[T: Catalog](ItemStore[T]):
+    """
+    Stores records of a dataclass in a table of a SQLite database.
+
+    Columns are named after the dataclass fields, and the table is keyed by area and
+    ``detail_url``: appending a record of the same supplier in the same area replaces
+    the former one. Lists are stored as JSON text. Areas live in the ``areas`` table
+    shared by all tables of the database, and ``domain`` is indexed as well.
+
+    Appended records are buffered and inserted with ``executemany`` every
+    ``batch_size`` records. The database is opened in WAL mode, so other processes
+    (e.g. ``inspector.py``) can query it while the crawler is writing.
+    """
+
+    path: pathlib.Path
+    table: str
+    record_type: type[T]
+    batch_size: int
+    _connection: sqlite3.Connection
+    _columns: list[str]
+    _json_columns: set[str]
+    _defaults: dict[int, Any]
+    _pending: list[tuple]
+    _area_ids: dict[AdministrativeArea, int]
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        table: str,
+        record_type: type[T],
+        *,
+        batch_size: int = 64,
+    ) -> None:
+        self.path = path
+        self.table = table
+        self.record_type = record_type
+        self.batch_size = batch_size
+        self._columns = [field.name for field in fields(record_type)]
+        hints = get_type_hints(record_type)
+        self._json_columns = {c for c in self._columns if _is_sequence(hints[c])}
+        # positions of fields with defaults, which are NULL in rows added before them.
+        self._defaults = {
+            i: field.default
+            for i, field in enumerate(fields(record_type))
+            if field.default is not MISSING and field.default is not None
+        }
+        self._pending = []
+        self._area_ids = {}
+
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    @override
+    def append(self, area: AdministrativeArea, record: T) -> None:
+        values = []
+        for column in self._columns:
+            value = getattr(record, column)
+            if column in self._json_columns and value is not None:
+                value = json.dumps(list(value), ensure_ascii=False)
+            values.append(value)
+        self._pending.append((self._area_id(area), *values))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    @override
+    def __iter__(self) -> Iterator[tuple[AdministrativeArea, T]]:
+        yield from self._select("", ())
+
+    @override
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        placeholders = ", ".join("?" for _ in range(len(self._columns) + 1))
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} "
+                f"(area_id, {", ".join(self._columns)}) VALUES ({placeholders})",
+                self._pending,
+            )
+        self._pending.clear()
+
+    @override
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+
+    @override
+    def count_by_area(self) -> dict[AdministrativeArea, int]:
+        self.flush()
+        rows = self._connection.execute(
+            f"SELECT areas.address, areas.name, COUNT(*) FROM {self.table} "
+            f"JOIN areas ON areas.id = {self.table}.area_id "
+            f"GROUP BY {self.table}.area_id ORDER BY MIN({self.table}.rowid)"
+        )
+        return {_resolve_area(address, name): count for address, name, count in rows}
+
+    @override
+    def of_area(self, area: AdministrativeArea) -> Iterator[T]:
+        """Records of the given area, using the primary key index."""
+        for _, record in self._select("WHERE area_id = ?", (self._area_id(area),)):
+            yield record
+
+    def of_domain(self, domain: str) -> Iterator[tuple[AdministrativeArea, T]]:
+        """Records of the given supplier domain, in all areas."""
+        yield from self._select(f"WHERE {self.table}.domain = ?", (domain,))
+
+    def of_url(self, detail_url: str) -> Iterator[tuple[AdministrativeArea, T]]:
+        """Records of the given supplier page, in all areas."""
+        yield from self._select(f"WHERE {self.table}.detail_url = ?", (detail_url,))
+
+    def _select(
+        self,
+        where: str,
+        parameters: tuple,
+    ) -> Iterator[tuple[AdministrativeArea, T]]:
+        self.flush()
+        columns = ", ".join(f"{self.table}.{column}" for column in self._columns)
+        cursor = self._connection.execute(
+            f"SELECT areas.address, areas.name, {columns} "
+            f"FROM {self.table} JOIN areas ON areas.id = {self.table}.area_id "
+            f"{where} ORDER BY {self.table}.rowid",
+            parameters,
+        )
+        areas: dict[tuple[str, str], AdministrativeArea] = {}
+        for address, name, *values in cursor:
+            if (address, name) not in areas.keys():
+                areas[(address, name)] = _resolve_area(address, name)
+            for i, column in enumerate(self._columns):
+                if column in self._json_columns and values[i] is not None:
+                    values[i] = json.loads(values[i])
+            for i, default in self._defaults.items():
+                if values[i] is None:
+                    values[i] = default
+            record = self.record_type(*values)
+            yield areas[(address, name)], record
+
+    def _area_id(self, area: AdministrativeArea) -> int:
+        if area not in self._area_ids.keys():
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO areas (address, name) VALUES (?, ?)",
+                    (area.address, area.name),
+                )
+            (self._area_ids[area],) = self._connection.execute(
+                "SELECT id FROM areas WHERE address = ? AND name = ?",
+                (area.address, area.name),
+            ).fetchone()
+        return self._area_ids[area]
+
+    def _create_schema(self) -> None:
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS areas ("
+                "id INTEGER PRIMARY KEY, address TEXT NOT NULL, name TEXT NOT NULL, "
+                "UNIQUE (address, name))"
+            )
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "area_id INTEGER NOT NULL REFERENCES areas (id), "
+                f"{", ".join(self._columns)}, "
+                "PRIMARY KEY (area_id, detail_url))"
+            )
+
+            # fields added to the dataclass after the table was created, with their
+            # defaults for the rows already there.
+            info = self._connection.execute(f"PRAGMA table_info({self.table})")
+            existing = {row[1] for row in info}
+            for field in fields(self.record_type):
+                if field.name in existing:
+                    continue
+                column = field.name
+                if field.default is not MISSING and field.default is not None:
+                    column += f" DEFAULT {_literal(field.default)}"
+                self._connection.execute(
+                    f"ALTER TABLE {self.table} ADD COLUMN {column}"
+                )
+
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_domain "
+                f"ON {self.table} (domain)"
+            )
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_detail_url "
+                f"ON {self.table} (detail_url)"
+            )
+
+
+def _literal(value: Any) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def _is_sequence(annotation: Any) -> bool:
+    if get_origin(annotation) in (list, tuple):
+        return True
+    return any(_is_sequence(arg) for arg in get_args(annotation))
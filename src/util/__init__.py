@@ -1,2 +1,6 @@
 from .area import *  # noqa: F403
+from .extraction import *  # noqa: F403
+from .freshness import *  # noqa: F403
+from .partition import *  # noqa: F403
+from .selector import *  # noqa: F403
 from .url import *  # noqa: F403
@@ -1,7 +1,8 @@
+import sys
 from collections import deque
 from dataclasses import dataclass
 from functools import cache
-from typing import override
+from typing import Any, override
 
 from ..conf import CONFIG
 
@@ -13,7 +14,7 @@ __all__ = [
 ]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AdministrativeArea(object):
     """
     Corresponding data structure of `administrative-area`s in configuration.
@@ -21,11 +22,26 @@ class AdministrativeArea(object):
     This class overrides :method:`__eq__` and :method:`__hash__`, in order to be used as
     dict keys or sets' elements. The ``children`` field does not participate in those
     because children's state does not affect the parent's.
+
+    Areas are immutable, with interned names. Areas pickled by previous versions (with
+    lists of children) are converted when unpickled.
     """
 
     address: str
     name: str
-    children: list["AdministrativeArea"] | None
+    children: tuple["AdministrativeArea", ...] | None
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "address", sys.intern(self.address))
+        object.__setattr__(self, "name", sys.intern(self.name))
+        if self.children is not None:
+            object.__setattr__(self, "children", tuple(self.children))
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"address": self.address, "name": self.name, "children": self.children}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(state["address"], state["name"], state.get("children"))
 
     @override
     def __eq__(self, value: object) -> bool:
@@ -69,36 +85,126 @@ def administrative_nodes() -> list[AdministrativeArea]:
     return nodes
 
 
-def search_administrative(address: str | list[str]) -> list[AdministrativeArea] | None:
+def search_administrative(address: str | list[str]) -> tuple[str, ...] | None:
+    """
+    Locates the text (e.g. an address) in administrative area trees.
+
+    Returns the names of areas on the path from the root to the deepest area whose
+    ``address`` or ``name`` occurs in the text, or ``None`` if no area occurs. When
+    multiple areas occur, earlier children and earlier trees take precedence. The same
+    path is returned as the same tuple every time.
+
+    The text is scanned once by a multi-pattern automaton built from the trees.
+    """
     if isinstance(address, list):
         address = " ".join(address)
-    address = address.lower()
-    for node in administrative_nodes():
-        result = _search_administrative(address, node)
-        if result:
-            return result
-    return None
+    return _area_matcher().search(address.lower())
 
 
 def _parse_administrative_area(data: dict) -> AdministrativeArea:
-    area = AdministrativeArea(data["address"], data["name"], None)
+    children = None
     if "children" in data.keys():
-        children = []
-        for child_data in data["children"]:
-            children.append(_parse_administrative_area(child_data))
-        area.children = children
-    return area
-
-
-def _search_administrative(
-    address: str,
-    area: AdministrativeArea,
-) -> list[AdministrativeArea]:
-    if area.children:
-        for child in area.children:
-            childresult = _search_administrative(address, child)
-            if childresult:
-                return [area.name, *childresult]
-    if area.address.lower() in address:
-        return [area.name]
-    return None
+        children = tuple(map(_parse_administrative_area, data["children"]))
+    return AdministrativeArea(data["address"], data["name"], children)
+
+
+class _AreaMatcher(object):
+    """
+    Aho-Corasick automaton of the ``address``es and ``name``s of administrative areas.
+
+    Nodes are referred to by their indices in :func:`administrative_nodes`, and states
+    by their indices in ``_goto``. Matching a text marks the matched nodes along with
+    their ancestors, and the result path is found by descending from the first marked
+    root through the first marked children.
+    """
+
+    _goto: list[dict[str, int]]
+    _fail: list[int]
+    _output: list[list[int]]
+    _always: list[int]  # nodes with empty patterns, which occur in every text.
+    _parents: list[int | None]
+    _children: list[list[int]]
+    _roots: list[int]
+    _names: list[str]
+    _paths: list[tuple[str, ...]]  # names from the root to each node.
+
+    def __init__(self, roots: list[AdministrativeArea]) -> None:
+        nodes = administrative_nodes()
+        ids = {id(node): i for i, node in enumerate(nodes)}
+        self._names = [node.name for node in nodes]
+        self._roots = [ids[id(root)] for root in roots]
+        self._parents = [None] * len(nodes)
+        self._children = [[] for _ in nodes]
+        for i, node in enumerate(nodes):
+            for child in node.children or []:
+                self._parents[ids[id(child)]] = i
+                self._children[i].append(ids[id(child)])
+        self._paths = []
+        for i in range(len(nodes)):
+            parent = self._parents[i]  # parents come before children in `nodes`.
+            prefix = self._paths[parent] if parent is not None else ()
+            self._paths.append((*prefix, self._names[i]))
+
+        # trie of patterns.
+        self._goto, self._fail, self._output, self._always = [{}], [0], [[]], []
+        for i, node in enumerate(nodes):
+            for pattern in {node.address.lower(), node.name.lower()}:
+                if not pattern:
+                    self._always.append(i)
+                    continue
+                state = 0
+                for char in pattern:
+                    if char not in self._goto[state].keys():
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._output.append([])
+                        self._goto[state][char] = len(self._goto) - 1
+                    state = self._goto[state][char]
+                self._output[state].append(i)
+
+        # failure links, breadth-first. Transitions of the failure state are merged into
+        # each state, so that matching never follows failure links.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in list(self._goto[state].items()):
+                queue.append(next_state)
+                if state != 0:
+                    self._fail[next_state] = self._goto[self._fail[state]].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+            if state != 0:
+                self._goto[state] = self._goto[self._fail[state]] | self._goto[state]
+
+    def search(self, text: str) -> tuple[str, ...] | None:
+        marked = [False] * len(self._names)
+        for i in self._matches(text):
+            node: int | None = i
+            while node is not None and not marked[node]:
+                marked[node] = True
+                node = self._parents[node]
+
+        for root in self._roots:
+            if not marked[root]:
+                continue
+            node = root
+            while True:
+                child = next((c for c in self._children[node] if marked[c]), None)
+                if child is None:
+                    return self._paths[node]
+                node = child
+        return None
+
+    def _matches(self, text: str) -> set[int]:
+        matches = set(self._always)
+        goto, output = self._goto, self._output
+        state = 0
+        for char in text:
+            state = goto[state].get(char, 0)
+            if output[state]:
+                matches.update(output[state])
+        return matches
+
+
+@cache
+def _area_matcher() -> _AreaMatcher:
+    return _AreaMatcher(administrative_roots())
@@ -0,0 +1,43 @@
+import json
+from dataclasses import dataclass
+from functools import cached_property
+
+from lxml import etree
+from scrapy.http import Response, TextResponse
+
+__all__ = ["Extraction", "ExtractedResponse", "document_of"]
+
+
+@dataclass
+class Extraction(object):
+    """
+    Values of XPaths evaluated by a browser, in place of the page they're evaluated on.
+
+    ``records`` are the fields of every card of a catalog page, or the only record of
+    fields of a detail page. ``page`` contains values of XPaths evaluated once per page,
+    e.g. the next page link. Values are ``None`` if the XPaths match nothing.
+    """
+
+    records: list[dict[str, str | None]]
+    page: dict[str, str | None]
+
+
+class ExtractedResponse(TextResponse):
+    """
+    A compact response of a page whose XPaths are evaluated in the browser, with the
+    JSON of the :class:`Extraction` as its body.
+
+    Selectors accept its :attr:`extraction` wherever they accept the lxml tree of a
+    page, see :func:`document_of`.
+    """
+
+    @cached_property
+    def extraction(self) -> Extraction:
+        return Extraction(**json.loads(self.body))
+
+
+def document_of(response: Response) -> etree._Element | Extraction:
+    """What selectors evaluate on: the extraction, or the lxml tree of the page."""
+    if isinstance(response, ExtractedResponse):
+        return response.extraction
+    return response.selector.root
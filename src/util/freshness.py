@@ -0,0 +1,45 @@
+import time
+from dataclasses import dataclass
+from typing import Any
+
+__all__ = ["FreshnessPolicy"]
+
+
+@dataclass(frozen=True)
+class FreshnessPolicy(object):
+    """
+    When a crawled page is stale and should be fetched again.
+
+    A page lives ``ttl`` seconds after it's fetched, shortened by the factor
+    ``volatility`` for each change seen in its content so far, but no shorter than
+    ``min_ttl``: pages that changed often are refreshed sooner. Pages without the time
+    they were fetched (crawled by previous versions) are always stale.
+    """
+
+    ttl: float = 7 * 24 * 3600
+    min_ttl: float = 24 * 3600
+    volatility: float = 0.5
+
+    @staticmethod
+    def from_config(options: dict[str, Any]) -> "FreshnessPolicy":
+        """Reads the ``incremental`` section of configuration."""
+        default = FreshnessPolicy()
+        return FreshnessPolicy(
+            options.get("ttl", default.ttl),
+            options.get("min-ttl", default.min_ttl),
+            options.get("volatility", default.volatility),
+        )
+
+    def ttl_of(self, changes: int) -> float:
+        return max(self.min_ttl, self.ttl * self.volatility**changes)
+
+    def is_stale(
+        self,
+        fetched_at: float | None,
+        changes: int,
+        now: float | None = None,
+    ) -> bool:
+        if fetched_at is None:
+            return True
+        now = time.time() if now is None else now
+        return now - fetched_at >= self.ttl_of(changes)
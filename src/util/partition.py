@@ -0,0 +1,71 @@
+import zlib
+from dataclasses import dataclass, replace
+
+from .area import AdministrativeArea
+
+__all__ = ["Partition"]
+
+
+@dataclass(frozen=True)
+class Partition(object):
+    """
+    A slice of the crawl, for crawling with multiple processes or machines.
+
+    A partition may select a subset of areas by their addresses, and a shard ``index``
+    out of ``count`` shards, where each key (e.g. an area address or a supplier URL)
+    belongs to exactly one shard by its CRC32. Partitions of the same ``count`` with
+    different indices never overlap.
+
+    Processes sharing the work of a partition (e.g. through the shared frontier) are
+    told apart by ``worker``, and write stores of their own, as stores have a single
+    writer.
+
+    The default partition selects everything.
+    """
+
+    index: int = 0
+    count: int = 1
+    areas: frozenset[str] | None = None
+    worker: str | None = None
+
+    @staticmethod
+    def parse(
+        shard: str | None = None,
+        areas: str | None = None,
+        worker: str | None = None,
+    ) -> "Partition":
+        """
+        Parses spider arguments, e.g. ``-a shard=0/4`` and ``-a areas=taizhou,taixing``.
+        """
+        index, count = 0, 1
+        if shard is not None:
+            index, count = (int(part) for part in shard.split("/"))
+            assert 0 <= index < count, f"invalid shard {shard!r}"
+        selected = None
+        if areas is not None:
+            selected = frozenset(area.strip() for area in areas.split(","))
+        return Partition(index, count, selected, worker)
+
+    @property
+    def name(self) -> str | None:
+        """Name of the partition of stores, or ``None`` for the whole crawl."""
+        parts = []
+        if self.areas is not None:
+            parts.append("areas-" + "+".join(sorted(self.areas)))
+        if self.count > 1:
+            parts.append(f"shard-{self.index}-of-{self.count}")
+        if self.worker is not None:
+            parts.append(f"worker-{self.worker}")
+        return ".".join(parts) if parts else None
+
+    def is_worker_of(self, name: str | None) -> bool:
+        """Whether the partition name is of a worker of the same areas and shard."""
+        parent = replace(self, worker=None).name
+        prefix = "worker-" if parent is None else f"{parent}.worker-"
+        return name is not None and name.startswith(prefix)
+
+    def owns_area(self, area: AdministrativeArea) -> bool:
+        return self.areas is None or area.address in self.areas
+
+    def owns(self, key: str) -> bool:
+        return zlib.crc32(key.encode()) % self.count == self.index
@@ -0,0 +1,209 @@
+import re
+
+from lxml import etree
+
+from .extraction import Extraction
+
+__all__ = ["CatalogSelector", "DetailSelector"]
+
+
+class CatalogSelector(object):
+    """
+    Compiled XPaths of the ``xpath.catalog`` section of configuration.
+
+    Expressions are compiled once when constructed, so malformed ones are reported at
+    the start of the crawl rather than on the first response. They are evaluated
+    directly on the lxml tree of responses, without creating Scrapy selectors for each
+    card.
+
+    All fields of a card are evaluated at once by a single XPath joining the first
+    results of them, unless some field does not evaluate to a node-set. Fields whose
+    first result is an element are evaluated again on their own, to be serialized.
+
+    ``page-count`` is optional, since the page count is not shown on all pages.
+    ``content`` is the uncompiled XPath checked by :meth:`has_content`, for browsers to
+    wait for.
+
+    Methods accept an :class:`Extraction` in place of the tree, for XPaths evaluated by
+    browsers as specified by :meth:`extraction_spec`.
+    """
+
+    content: str
+    xpaths: dict[str, str]
+    card: etree.XPath
+    fields: dict[str, etree.XPath]
+    combined: etree.XPath | None
+    next_page_link: etree.XPath
+    page_count: etree.XPath | None
+
+    def __init__(self, xpaths: dict[str, str]) -> None:
+        self.content = xpaths["card"]
+        self.xpaths = xpaths
+        self.card = _compile("card", xpaths["card"])
+        self.next_page_link = _compile("next-page-link", xpaths["next-page-link"])
+        self.page_count = None
+        if "page-count" in xpaths.keys():
+            self.page_count = _compile("page-count", xpaths["page-count"])
+        self.fields = {
+            key: _compile(key, xpath)
+            for key, xpath in xpaths.items()
+            if key not in ("card", "next-page-link", "page-count")
+        }
+        self.combined = _combine([xpaths[key] for key in self.fields.keys()])
+
+    def extraction_spec(self) -> dict:
+        """XPaths for browsers to evaluate into an :class:`Extraction`."""
+        page = {"next-page-link": self.xpaths["next-page-link"]}
+        if self.page_count is not None:
+            page["page-count"] = self.xpaths["page-count"]
+        return {
+            "card": self.xpaths["card"],
+            "fields": {key: [self.xpaths[key]] for key in self.fields.keys()},
+            "page": page,
+        }
+
+    def next_page(self, root: etree._Element | Extraction) -> str | None:
+        if isinstance(root, Extraction):
+            return root.page.get("next-page-link")
+        return _first(self.next_page_link(root))
+
+    def pages(self, root: etree._Element | Extraction) -> int | None:
+        """Total pages of the search results, or ``None`` if it's not found."""
+        if self.page_count is None:
+            return None
+        if isinstance(root, Extraction):
+            count = root.page.get("page-count")
+        else:
+            count = _first(self.page_count(root))
+        match = re.search(r"\d+", count or "")
+        return int(match.group()) if match else None
+
+    def cards(self, root: etree._Element | Extraction) -> list[dict[str, str | None]]:
+        """Fields of every card, with ``None`` for the missing ones."""
+        if isinstance(root, Extraction):
+            return root.records
+        if self.combined is None:
+            return [
+                {key: _first(xpath(card)) for key, xpath in self.fields.items()}
+                for card in self.card(root)
+            ]
+        records = []
+        for card in self.card(root):
+            record = {}
+            results = self.combined(card).split(_SEPARATOR)
+            for (key, xpath), result in zip(self.fields.items(), results):
+                found, element, value = result[0], result[1], result[2:]
+                if found == "0":
+                    record[key] = None
+                elif element == "1":
+                    record[key] = _first(xpath(card))
+                else:
+                    record[key] = value
+            records.append(record)
+        return records
+
+    def has_content(self, root: etree._Element | Extraction) -> bool:
+        if isinstance(root, Extraction):
+            return len(root.records) > 0
+        return len(self.card(root)) > 0
+
+
+class DetailSelector(object):
+    """
+    Compiled XPaths of the ``xpath.detail`` section of configuration.
+
+    A field may have a list of alternative XPaths, of which the first non-empty result
+    is taken. ``content`` is the union of all XPaths, checked by :meth:`has_content`.
+
+    Methods accept an :class:`Extraction` in place of the tree, as
+    :class:`CatalogSelector` does.
+    """
+
+    content: str
+    xpaths: dict[str, list[str]]
+    fields: dict[str, list[etree.XPath]]
+
+    def __init__(self, xpaths: dict[str, str | list[str]]) -> None:
+        self.xpaths = {}
+        self.fields = {}
+        for key, alternatives in xpaths.items():
+            if isinstance(alternatives, str):
+                alternatives = [alternatives]
+            self.xpaths[key] = alternatives
+            self.fields[key] = [_compile(key, xpath) for xpath in alternatives]
+        self.content = " | ".join(x for xs in self.xpaths.values() for x in xs)
+
+    def extraction_spec(self) -> dict:
+        """XPaths for browsers to evaluate into an :class:`Extraction`."""
+        return {"card": None, "fields": self.xpaths, "page": {}}
+
+    def extract(self, root: etree._Element | Extraction) -> dict[str, str]:
+        """Fields of the page, with empty strings for the missing ones."""
+        if isinstance(root, Extraction):
+            (record,) = root.records
+            return {key: record.get(key) or "" for key in self.fields.keys()}
+        result = {}
+        for key, alternatives in self.fields.items():
+            result[key] = ""
+            for xpath in alternatives:
+                value = _first(xpath(root))
+                if value:
+                    result[key] = value
+                    break
+        return result
+
+    def has_content(self, root: etree._Element | Extraction) -> bool:
+        if isinstance(root, Extraction):
+            return any(value is not None for value in root.records[0].values())
+        return any(
+            len(xpath(root)) > 0
+            for alternatives in self.fields.values()
+            for xpath in alternatives
+        )
+
+
+def _compile(key: str, xpath: str) -> etree.XPath:
+    try:
+        return etree.XPath(xpath)
+    except etree.XPathSyntaxError as e:
+        raise ValueError(f"invalid XPath of {key!r}: {xpath}") from e
+
+
+# joins the results of fields in combined XPaths, a character of the private use area
+# that pages never contain.
+_SEPARATOR = "\ue000"
+
+
+def _combine(xpaths: list[str]) -> etree.XPath | None:
+    """
+    A single XPath evaluating to the first results of ``xpaths``, joined by
+    ``_SEPARATOR``, or ``None`` if some of them do not evaluate to node-sets.
+
+    The result of each XPath is prefixed by two flags, whether there is a result and
+    whether it's an element, followed by its string value.
+    """
+    if not xpaths:
+        return None
+    parts = []
+    for xpath in xpaths:
+        first = f"({xpath})[1]"
+        parts.append(f"count({first}), count({first}[self::*]), string({first})")
+    combined = etree.XPath(f"concat({f', "{_SEPARATOR}", '.join(parts)})")
+    try:
+        combined(etree.Element("html"))
+    except etree.XPathEvalError:
+        return None  # e.g. of strings or numbers, which cannot be indexed.
+    return combined
+
+
+def _first(result: list | object) -> str | None:
+    # XPaths evaluate to node-sets in our configuration, but may also evaluate to
+    # strings, numbers or booleans.
+    if not isinstance(result, list):
+        return str(result)
+    if not result:
+        return None
+    first = result[0]
+    if isinstance(first, etree._Element):
+        return etree.tostring(first, encoding="unicode", method="html", with_tail=False)
+    return str(first)
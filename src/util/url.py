@@ -1,7 +1,13 @@
 from enum import StrEnum
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlparse
 
-__all__ = ["AlibabaSearchTab", "AlibabaSupplierCountry", "alibaba_search_url"]
+__all__ = [
+    "AlibabaSearchTab",
+    "AlibabaSupplierCountry",
+    "alibaba_search_url",
+    "domain_group",
+    "supplier_identity",
+]
 
 _BASEURL = "https://www.alibaba.com/trade/search"
 
@@ -74,3 +80,30 @@ def alibaba_search_url(
         assert page != 0, "page count of alibaba search URL starts from 1"
         params["page"] = page
     return _BASEURL + "?" + urlencode(params)
+
+
+def domain_group(url: str) -> str:
+    """
+    Groups the host of URL by the site it belongs to.
+
+    Suppliers have their own subdomains, e.g. ``xxx.en.alibaba.com``, which are grouped
+    together as ``*.en.alibaba.com``; other hosts are returned as is.
+    """
+    labels = (urlparse(url).hostname or "").split(".")
+    if len(labels) > 3 and not labels[-1].isdigit():  # not an IPv4 address
+        return "*." + ".".join(labels[-3:])
+    return ".".join(labels)
+
+
+def supplier_identity(detail_url: str, domain: str) -> str:
+    """
+    Identity of a supplier, shared by its search results in different areas.
+
+    Detail URLs are normalized without schemes, ``www.``, queries (e.g. tracking
+    parameters), fragments and trailing slashes. Hosts and domains are case-insensitive.
+    """
+    url = urlparse(detail_url if "//" in detail_url else "//" + detail_url)
+    host = (url.hostname or "").removeprefix("www.")
+    if url.port is not None:
+        host += f":{url.port}"
+    return f"{domain.strip().lower()}|{host}{url.path.rstrip('/')}"
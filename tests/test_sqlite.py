@@ -0,0 +1,91 @@
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+from dataclasses import replace
+
+from src.items import Detail
+from src.storage import SqliteStore
+from src.util import AdministrativeArea, FreshnessPolicy
+
+AREA = AdministrativeArea("Taizhou, Jiangsu", "Taizhou", None)
+
+
+class SqliteMigrationTest(unittest.TestCase):
+    """Tables created by previous versions, before fields were added to records."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name) / "details.sqlite3"
+        # the schema of details before `fetched_at`, `content_hash` and `changes`.
+        with sqlite3.connect(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE areas (id INTEGER PRIMARY KEY, address TEXT NOT NULL, "
+                "name TEXT NOT NULL, UNIQUE (address, name))"
+            )
+            connection.execute(
+                "CREATE TABLE details (area_id INTEGER NOT NULL REFERENCES areas (id), "
+                "detail_url, domain, name, provided_products, administrative_address, "
+                "bill, orders, PRIMARY KEY (area_id, detail_url))"
+            )
+            connection.execute(
+                "INSERT INTO areas (address, name) VALUES (?, ?)",
+                (AREA.address, AREA.name),
+            )
+            connection.execute(
+                "INSERT INTO details VALUES (1, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    "https://example.en.alibaba.com/company_profile.html",
+                    "example",
+                    "Example Co., Ltd.",
+                    "valves",
+                    '["Jiangsu", "Taizhou"]',
+                    "US$1 Million",
+                    "100",
+                ),
+            )
+        connection.close()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_added_fields_have_defaults(self) -> None:
+        store = SqliteStore(self.path, "details", Detail)
+        try:
+            [(area, detail)] = list(store)
+        finally:
+            store.close()
+        self.assertEqual(area, AREA)
+        self.assertIsNone(detail.fetched_at)
+        self.assertIsNone(detail.content_hash)
+        self.assertEqual(detail.changes, 0)
+        self.assertEqual(detail.administrative_address, ("Jiangsu", "Taizhou"))
+        self.assertTrue(FreshnessPolicy().is_stale(detail.fetched_at, detail.changes))
+
+    def test_rows_migrated_without_defaults(self) -> None:
+        # tables migrated by previous versions, which added the columns as NULL.
+        with sqlite3.connect(self.path) as connection:
+            for column in ("fetched_at", "content_hash", "changes"):
+                connection.execute(f"ALTER TABLE details ADD COLUMN {column}")
+        connection.close()
+        store = SqliteStore(self.path, "details", Detail)
+        try:
+            [(_, detail)] = list(store)
+        finally:
+            store.close()
+        self.assertEqual(detail.changes, 0)
+
+    def test_appended_after_migration(self) -> None:
+        store = SqliteStore(self.path, "details", Detail)
+        try:
+            [(_, detail)] = list(store)
+            store.append(AREA, replace(detail, fetched_at=1.0, changes=2))
+            [(_, detail)] = list(store)
+        finally:
+            store.close()
+        self.assertEqual(detail.fetched_at, 1.0)
+        self.assertEqual(detail.changes, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()